@@ -41,7 +41,7 @@ class Admin(Cog):
         embed.add_field(name='Python Version:', value=platform.python_version())
         embed.add_field(name='nextcord.Py Version', value=dpy_v)
         embed.add_field(name='Total Guilds:', value=str(len(self.bot.guilds)))
-        embed.add_field(name='Total Users:', value=str(len(set(self.bot.get_all_members()))))
+        embed.add_field(name='Total Users:', value=str(sum(guild.member_count or 0 for guild in self.bot.guilds)))
         embed.add_field(name='Bot Developers:', value=f"{self.bot.owner}")
         embed.set_image(url=r.url)
         embed.set_author(name=ctx.author.name, icon_url=ctx.author.display_avatar.url)
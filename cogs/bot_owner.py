@@ -1,6 +1,7 @@
 import asyncio
 import contextlib
 import io
+import json
 import os
 import sys
 
@@ -8,7 +9,7 @@ from textwrap import indent, dedent
 import traceback
 from traceback import format_exception
 
-from nextcord import Embed, Colour, DiscordException
+from nextcord import Embed, Colour, DiscordException, File
 from nextcord.ext.commands import (
     bot_has_permissions,
     Cog, command,
@@ -19,9 +20,9 @@ from nextcord.ext.commands import (
 
 from core.bot import MainBot
 from core.constants import COMMAND_CHANNELS
-from utils.checks import is_manager
-from core.pawgenator import Paginator
-from utils.util import clean_code
+from utils.checks import is_manager, check_cache
+from core.pawgenator import text_source
+from utils.util import clean_code, rss_mb
 
 
 class BotOwner(Cog):
@@ -59,19 +60,105 @@ class BotOwner(Cog):
     @is_owner()
     async def getcache(self, ctx: Context):
         cache = self.bot.cache["msg_cache"]
-        description = str(cache.items())
-        pages = [description[i: i + 2000] for i in range(0, len(description), 2000)]
-        em = []
-        for index, page in enumerate(pages):
-            em.append(Embed(
-                color=Colour.random(),
-                title="Cache Details",
-                description=f"```py\n{page}\n```"
-            ).set_footer(text=f"Page {index}/{len(pages)}"))
-        if len(em) == 1:
-            await ctx.reply(embed=em)
+        text = str(cache.items())
+        source, count = text_source(text, title="Cache Details")
+        if count == 1:
+            await ctx.reply(embed=source(0))
         else:
-            await Paginator(channel=ctx.channel, user=ctx.author, embeds=em).start()
+            # The text only stays in memory, it is large and not meant for the database
+            await self.bot.views.paginate(
+                ctx.channel, ctx.author, "text", {"text": text, "title": "Cache Details"}, count, persist=False)
+
+    @command(name="dbstats", aliases=["dbs"])
+    @check(is_manager)
+    @cooldown(1, 3, BucketType.user)
+    async def db_stats(self, ctx: Context):
+        """
+        Shows MongoDB latency per collection and operation, with the full dump attached as json.
+        Use for telling apart a slow database from a slow Discord
+        """
+        snapshot = self.bot.mongo_metrics.snapshot()
+        rows = sorted(
+            ((collection, operation, stats) for collection, operations in snapshot.items()
+             for operation, stats in operations.items()),
+            key=lambda row: row[2]["avg_ms"] * row[2]["count"], reverse=True
+        )
+        description = "\n".join(
+            f"`{collection}` **{operation}** x{stats['count']} | p50 `{stats['p50_ms']}ms` "
+            f"p99 `{stats['p99_ms']}ms` max `{stats['max_ms']}ms` | in flight `{stats['in_flight']}`"
+            for collection, operation, stats in rows[:15]
+        )
+        await ctx.reply(
+            embed=Embed(
+                color=Colour.random(),
+                title="__Database Latency__",
+                description=description or "No database commands yet"
+            ),
+            file=File(io.BytesIO(json.dumps(snapshot, indent=4).encode()), filename="dbstats.json"),
+            delete_after=None if ctx.channel.id in COMMAND_CHANNELS else 30
+        )
+
+    @command(name="cogstats", aliases=["cogs"])
+    @check(is_manager)
+    @cooldown(1, 3, BucketType.user)
+    async def load_stats(self, ctx: Context):
+        """
+        Shows how long each cog took to import and set up on startup, slowest first,
+        and how the on_ready stages went
+        """
+        report = self.bot.cog_report
+        rows = sorted(
+            report.items(), key=lambda row: (row[1]["import_ms"] or 0) + (row[1]["setup_ms"] or 0), reverse=True
+        )
+        description = "\n".join(
+            f"`{name}` **failed** `{stats['error']}`" if stats["error"] else
+            f"`{name}` setup `{stats['setup_ms']}ms`" if stats["import_ms"] is None else
+            f"`{name}` import `{stats['import_ms']}ms` | setup `{stats['setup_ms']}ms`"
+            for name, stats in rows
+        )
+        await ctx.reply(
+            embed=Embed(
+                color=Colour.random(),
+                title="__Cog Load Times__",
+                description=description or "No cogs loaded on startup"
+            ).add_field(
+                name="Stages",
+                value="\n".join(
+                    f"`{name}` {stats['status'] or 'running'} | `{stats['ms']}ms` x{stats['runs']}"
+                    for name, stats in self.bot.stage_times.items()
+                ) or "Not ready yet",
+                inline=False
+            ).set_footer(text=f"Pre-warmed imports: {'yes' if self.bot.prewarm_cogs else 'no'}"),
+            delete_after=None if ctx.channel.id in COMMAND_CHANNELS else 30
+        )
+
+    @command(name="memstats", aliases=["mem"])
+    @check(is_manager)
+    @cooldown(1, 3, BucketType.user)
+    async def mem_stats(self, ctx: Context):
+        """
+        Shows how many objects are cached per type, the intents, check cache hits and the process memory
+        """
+        sizes = self.bot.cache_sizes()
+        rss = rss_mb()
+        await ctx.reply(
+            embed=Embed(
+                color=Colour.random(),
+                title="__Cache Sizes__",
+                description="\n".join(f"**{name.replace('_', ' ').title()}** `{count}`" for name, count in sizes.items())
+            ).add_field(
+                name="Intents",
+                value=", ".join(name for name, enabled in self.bot.intents if enabled),
+                inline=False
+            ).add_field(
+                name="Member Cache",
+                value=", ".join(name for name, enabled in self.bot._connection.member_cache_flags if enabled) or "none"
+            ).add_field(
+                name="Check Cache",
+                value=" | ".join(f"{name} `{value}`" for name, value in check_cache.stats.items())
+            ).set_footer(text=f"RSS: {rss:.1f} MiB" if rss is not None else "RSS: unknown"),
+            delete_after=None if ctx.channel.id in COMMAND_CHANNELS else 30
+        )
 
     @command(
         name="logout",
@@ -138,14 +225,12 @@ class BotOwner(Cog):
                 result = f"{stdout.getvalue()}\n-- {obj}\n"
         except Exception as e:
             result = "".join(format_exception(e, e, e.__traceback__))
-        pages = [result[i: i + 2000] for i in range(0, len(result), 2000)]
-        em = []
-        for index, page in enumerate(pages):
-            em.append(Embed(
-                color=Colour.random(),
-                description=f"```py\n{page}\n```"
-            ).set_footer(text=f"Page {index}/{len(pages)}"))
-        await Paginator(channel=ctx.channel, user=ctx.author, embeds=em).start()
+        source, count = text_source(result)
+        if count == 1:
+            await ctx.reply(embed=source(0))
+        else:
+            # Eval output can hold secrets, keep it out of the database
+            await self.bot.views.paginate(ctx.channel, ctx.author, "text", {"text": result}, count, persist=False)
 
 
 def setup(bot):
@@ -6,9 +6,11 @@ from nextcord.ext.commands import (
     MissingRequiredArgument,
     Context, Cog, MemberNotFound
 )
-from nextcord import Member
+from nextcord import Member, Role
+from nextcord.abc import GuildChannel
 
 from core.bot import MainBot
+from utils.checks import invalidate_member, check_cache
 from utils.util import Raise
 
 
@@ -20,9 +22,25 @@ class Events(Cog):
     async def on_command(self, ctx):
         pass
 
+    @Cog.listener()
+    async def on_member_update(self, before: Member, after: Member):
+        # noinspection PyProtectedMember
+        if before._roles != after._roles:
+            invalidate_member(after.id)
+
     @Cog.listener()
     async def on_member_remove(self, member: Member):
-        pass
+        invalidate_member(member.id)
+
+    @Cog.listener()
+    async def on_guild_role_update(self, before: Role, after: Role):
+        # Permissions of the role changed for everyone who has it
+        check_cache.invalidate()
+
+    @Cog.listener()
+    async def on_guild_channel_update(self, before: GuildChannel, after: GuildChannel):
+        if before.overwrites != after.overwrites:
+            check_cache.invalidate()
 
     @Cog.listener()
     async def on_command_error(self, ctx: Context, error):
@@ -53,14 +71,14 @@ class Events(Cog):
 
         # Implement further custom checks for errors here...
         try:
-            await self._bot.log.send(f"{ctx.channel.mention} {ctx.author} \n {error}")
+            self._bot.log.send(f"{ctx.channel.mention} {ctx.author} \n {error}")
         except TypeError:
             pass
         raise error
 
     @Cog.listener()
     async def on_error(self, event, *args, **kwargs):
-        await self._bot.log.send(f"event: {event} \n error: \n{args} \n{kwargs}")
+        self._bot.log.send(f"event: {event} \n error: \n{args} \n{kwargs}")
 
     @Cog.listener()
     async def on_message(self, message):
@@ -68,8 +86,9 @@ class Events(Cog):
             return
 
         # Whenever the bot is tagged, respond with its prefix
-        if message.content.startswith(f"<@!{self._bot.user.id}>"):
-            await message.channel.send(f":eyes: My prefix here is `{self._bot.get_prefix(message)}`", delete_after=10)
+        if message.content.startswith(self._bot.mentions):
+            await message.channel.send(
+                f":eyes: My prefix here is `{self._bot.primary_prefix(message)}`", delete_after=10)
 
 
 def setup(bot):
@@ -4,6 +4,7 @@ from core.bot import MainBot
 from core.constants import COMMAND_CHANNELS
 from core.help import EmbedHelpCommand
 from utils import logging
+from utils.checks import dry_run
 from utils.util import Raise
 
 logger = logging.get_logger(__name__)
@@ -23,12 +24,13 @@ class Help(Cog, name="Help command"):
 
     @Cog.listener()
     async def on_ready(self):
-        logger.info(f"{self.__class__.__name__} Cog has been loaded")
+        logger.info("%s Cog has been loaded", self.__class__.__name__)
         logger.line()
 
     async def cog_check(self, ctx: Context):
         if ctx.channel.id not in COMMAND_CHANNELS:
-            await Raise(ctx, "Help command only usable in command channels").info()
+            if not dry_run.get():
+                await Raise(ctx, "Help command only usable in command channels").info()
             return False
         return True
 
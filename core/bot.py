@@ -1,107 +1,521 @@
 __version__ = '0.1.0'
 
 # Standard libraries
+import ast
+import asyncio
+import importlib
+import importlib.util
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Tuple
 
 # Third party libraries
 import aiohttp
 from nextcord import (
     __version__ as dpy_v,
     Status, Activity, ActivityType,
-    Embed, Color, Member, Intents, Guild
+    Embed, Color, Member, Intents, Guild, MemberCacheFlags
 )
-from nextcord.ext.commands import Bot, when_mentioned_or
+from nextcord.ext.commands import Bot
 import motor.motor_asyncio
+from pymongo import IndexModel
 from dotenv import load_dotenv
 
 # Local code
 # from utils.keep_alive import webserver
 from utils.logging import Log
-from utils.json import read_json, json_unset
-from utils.mongo import Document
+from utils.json import get_store
+from utils.mongo import Document, CommandMetrics
+from utils.mongo_memory import MemoryClient
+from utils.timers import MessageWaiters, timer_wheel
 from utils import logging
-# from .views import add_views
+from .views import ViewDispatcher, ViewStateStore
 
 load_dotenv()
 ROOT_DIR = str(Path(__file__).parents[1])
 logger = logging.get_logger(__name__)
-logger.info(f"{ROOT_DIR}\n-----")
+logger.info("%s\n-----", ROOT_DIR)
 
 __all__ = ["BaseMainBot", "MainBot"]
 
+# Modules a soft restart reloads, a change anywhere else in here needs a real re-exec
+SOFT_RELOADABLE = {"core/constants.py"}
+
+
+def _source_mtimes() -> Dict[str, float]:
+    """Modification times of the code a soft restart can't reload"""
+    root = Path(ROOT_DIR)
+    files = [root / "main.py", *root.glob("core/*.py"), *root.glob("utils/*.py")]
+    return {
+        path.relative_to(root).as_posix(): path.stat().st_mtime
+        for path in files if path.relative_to(root).as_posix() not in SOFT_RELOADABLE
+    }
+
+# Environment variable: (MongoClient option, type)
+MONGO_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": ("maxPoolSize", int),
+    "MONGO_MIN_POOL_SIZE": ("minPoolSize", int),
+    "MONGO_MAX_IDLE_MS": ("maxIdleTimeMS", int),
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": ("waitQueueTimeoutMS", int),
+    "MONGO_CONNECT_TIMEOUT_MS": ("connectTimeoutMS", int),
+    "MONGO_SOCKET_TIMEOUT_MS": ("socketTimeoutMS", int),
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": ("serverSelectionTimeoutMS", int),
+    "MONGO_COMPRESSORS": ("compressors", str),  # e.g. "zstd,snappy,zlib", needs zstandard/python-snappy installed
+    "MONGO_READ_PREFERENCE": ("readPreference", str),  # e.g. "secondaryPreferred"
+}
+
+# Listener: the intent its event needs, for INTENTS=auto
+EVENT_INTENTS = {
+    "on_member_join": "members",
+    "on_member_remove": "members",
+    "on_member_update": "members",
+    "on_user_update": "members",
+    "on_presence_update": "presences",
+    "on_member_ban": "bans",
+    "on_member_unban": "bans",
+    "on_guild_emojis_update": "emojis_and_stickers",
+    "on_guild_stickers_update": "emojis_and_stickers",
+    "on_guild_integrations_update": "integrations",
+    "on_webhooks_update": "webhooks",
+    "on_invite_create": "invites",
+    "on_invite_delete": "invites",
+    "on_voice_state_update": "voice_states",
+    "on_reaction_add": "reactions",
+    "on_reaction_remove": "reactions",
+    "on_reaction_clear": "reactions",
+    "on_raw_reaction_add": "reactions",
+    "on_raw_reaction_remove": "reactions",
+    "on_typing": "typing",
+    "on_guild_scheduled_event_create": "scheduled_events",
+    "on_guild_scheduled_event_update": "scheduled_events",
+    "on_guild_scheduled_event_delete": "scheduled_events",
+}
+# What prefix commands need whatever the listeners are
+BASE_INTENTS = ("guilds", "guild_messages", "dm_messages", "message_content")
+
+
+def _env_intents() -> Intents:
+    """
+    Intents of the INTENTS environment variable, "all" (the default), "default", "auto"
+    or a comma separated list of intent names. "auto" starts from BASE_INTENTS and gets
+    the rest from the registered listeners once the cogs are loaded
+    """
+    value = os.getenv("INTENTS", "all").strip().lower()
+    if value == "all":
+        return Intents.all()
+    if value == "default":
+        intents = Intents.default()
+        intents.message_content = True
+        return intents
+    names = BASE_INTENTS if value == "auto" else [name.strip() for name in value.split(",") if name.strip()]
+    return Intents(**{name: True for name in ("guilds", *names)})
+
+
+def _env_member_cache(intents: Intents) -> MemberCacheFlags:
+    """
+    Member cache flags of the MEMBER_CACHE environment variable, "auto" (follow the intents, the default),
+    "none" or a comma separated list of "joined" and "voice"
+    """
+    value = os.getenv("MEMBER_CACHE", "auto").strip().lower()
+    if value == "auto":
+        return MemberCacheFlags.from_intents(intents)
+    if value == "none":
+        return MemberCacheFlags.none()
+    return MemberCacheFlags(**{name.strip(): True for name in value.split(",") if name.strip()})
+
 
 class BaseMainBot(Bot):
+    DEFAULT_PREFIXES: Tuple[str, ...] = ("!",)  # Overridden by a "prefixes" list in assets/config.json
+    TEST_PREFIXES: Tuple[str, ...] = ("$",)
+    # Bumped whenever a command is added or removed, so the help pages know when to re-render.
+    # On the class, Bot.__init__ already adds the default help command
+    command_tree_version: int = 0
+
     def __init__(self):
+        intents = _env_intents()
         super().__init__(
             command_prefix=self.get_prefix,
             case_insensitive=True,
             owner_id=506498413857341440,
-            intents=Intents.all(),
+            intents=intents,
+            member_cache_flags=_env_member_cache(intents),
+            # Guilds are only chunked at startup with CHUNK_GUILDS=1 and the members intent,
+            # decided again in apply_intents since INTENTS=auto only settles them later
+            chunk_guilds_at_startup=intents.members and os.getenv("CHUNK_GUILDS") == "1",
+            max_messages=int(os.getenv("MAX_MESSAGES", 1000)) or None,
             strip_after_prefix=True,
             status=Status.online,
             activity=Activity(type=ActivityType.watching, name="Worldwide 👀")
         )
         # Defining a few things
         self.guild: Optional[Guild] = None
+        # Compiled prefixes per guild id, None being the default ones
+        self._compiled_prefixes: Dict[Optional[int], Tuple[str, ...]] = {}
+        self._prefixes_config_version = -1  # config.version the compiled prefixes were built from
+        self._mentions: Optional[Tuple[str, str]] = None
+        self.guild_prefixes: Dict[int, Tuple[str, ...]] = {}
         self.test: bool = False  # True: will disable few events trigger, for easier testing
         # Webhook session
         self.session = aiohttp.ClientSession(trust_env=True)
         self.log = Log(self)
+        self.config = get_store("config")
 
-        self.__mongo = motor.motor_asyncio.AsyncIOMotorClient(str(os.getenv("mongo")))
+        self.documents: List[Document] = []
+        self._index_task: Optional[asyncio.Task] = None
+        self.mongo_metrics = CommandMetrics()
+        # Cogs: imported on a thread pool before loading when prewarm_cogs is set (PREWARM_COGS=1)
+        self.prewarm_cogs: bool = os.getenv("PREWARM_COGS") == "1"
+        self.cog_report: Dict[str, Dict[str, Any]] = {}
+        self._cogs_loaded = False
+        # on_ready stages: name -> {"status", "ms", "runs"}
+        self.stage_times: Dict[str, Dict[str, Any]] = {}
+        self._stage_tasks: Dict[str, asyncio.Task] = {}
+        self._source_mtimes = _source_mtimes()
+        if str(os.getenv("mongo")).startswith("memory://"):
+            # No server needed, data only lives as long as the process
+            self.__mongo = MemoryClient()
+        else:
+            self.__mongo = motor.motor_asyncio.AsyncIOMotorClient(
+                str(os.getenv("mongo")), event_listeners=[self.mongo_metrics], **self._mongo_options())
         self._mongo_setup()
+        # Components of every persistent view (core.views) go through this one listener
+        self.views = ViewDispatcher(ViewStateStore(document=self.view_document))
+        self.add_listener(self.views.dispatch, "on_interaction")
+        # get_message prompts, looked up by (channel, author) instead of a check per waiter,
+        # fed from dispatch so messages nobody waits for don't cost a listener task
+        self.message_waiters = MessageWaiters()
+
+    @staticmethod
+    def _mongo_options() -> Dict[str, Any]:
+        """Connection pool, timeout, compression and read preference options set in the environment"""
+        options = {}
+        for env, (option, cast) in MONGO_OPTIONS.items():
+            value = os.getenv(env)
+            if value:
+                options[option] = cast(value)
+        return options
 
     def _mongo_setup(self):
         """MongoDB setup"""
         self.db = self.__mongo["database"]  # Type your database name here
 
-        self.collection = Document(self.db, "collection")  # Type your collection name here
+        # Type your collection name here, cache_size > 0 keeps hot documents in memory
+        # and write_behind=True batches increment/upsert calls for counter like collections.
+        # Indexes are declared with pymongo's IndexModel and created on startup, e.g.
+        # indexes=[IndexModel("xp"), IndexModel([("guild", 1), ("xp", -1)]),
+        #          IndexModel("expires", expireAfterSeconds=0),
+        #          IndexModel("warns", partialFilterExpression={"warns": {"$exists": True}})]
+        self.collection = self.add_document("collection", cache_size=1024, cache_ttl=300)
+        # Per guild prefixes, {"_id": guild_id, "prefixes": [...]}, only with GUILD_PREFIXES=1
+        self.prefix_document: Optional[Document] = (
+            self.add_document("prefixes") if os.getenv("GUILD_PREFIXES") == "1" else None
+        )
+        # Persistent view states, so their buttons survive a restart, only with PERSIST_VIEWS=1
+        self.view_document: Optional[Document] = (
+            self.add_document("views", indexes=[IndexModel("expires_at", expireAfterSeconds=0)])
+            if os.getenv("PERSIST_VIEWS") == "1" else None
+        )
         logger.info("Initialized Database")
 
+    def add_document(self, name: str, **options) -> Document:
+        """Creates a Document on our database and keeps track of it, so it can be flushed on close"""
+        document = Document(self.db, name, **options)
+        self.documents.append(document)
+        return document
+
+    async def ensure_indexes(self):
+        """
+        Creates missing indexes of every Document concurrently, logging what differs from the declarations.
+        Raises a RuntimeError naming the collections whose sync failed, after trying all of them
+        """
+        reports = await asyncio.gather(
+            *(document.ensure_indexes() for document in self.documents), return_exceptions=True)
+        failed = []
+        for document, report in zip(self.documents, reports):
+            if isinstance(report, Exception):
+                logger.error("Index sync of %s failed: %r", document.db.name, report)
+                failed.append(document.db.name)
+                continue
+            for key in ("missing", "extra", "changed"):
+                if report[key]:
+                    logger.info("%s %s indexes: %s", report["collection"], key, ", ".join(report[key]))
+        if failed:
+            raise RuntimeError(f"Index sync failed for {', '.join(failed)}")
+        logger.info("Indexes are in sync")
+
+    def dispatch(self, event_name: str, *args: Any, **kwargs: Any) -> None:
+        if event_name == "message" and self.message_waiters:
+            self.message_waiters.dispatch(args[0])
+        super().dispatch(event_name, *args, **kwargs)
+
+    def add_command(self, command):
+        super().add_command(command)
+        self.command_tree_version += 1
+
+    def remove_command(self, name: str):
+        command = super().remove_command(name)
+        if command is not None:
+            self.command_tree_version += 1
+        return command
+
+    def listener_intents(self) -> Intents:
+        """BASE_INTENTS plus the intents the registered listeners need"""
+        intents = Intents(**{name: True for name in ("guilds", *BASE_INTENTS)})
+        events = set(self.extra_events) | {name for name in dir(type(self)) if name.startswith("on_")}
+        for event in events:
+            if event in EVENT_INTENTS:
+                setattr(intents, EVENT_INTENTS[event], True)
+        return intents
+
+    def apply_intents(self, intents: Intents):
+        """Swaps the intents, and the member cache flags following them, before identifying"""
+        state = self._connection
+        flags = _env_member_cache(intents)
+        flags._verify_intents(intents)
+        state._intents = intents
+        state.member_cache_flags = flags
+        state._chunk_guilds = intents.members and os.getenv("CHUNK_GUILDS") == "1"
+        # Same as ConnectionState.__init__, users are only kept when members are
+        if not intents.members or flags._empty:
+            state.store_user = state.create_user
+            state.deref_user = state.deref_user_no_intents
+        else:
+            vars(state).pop("store_user", None)
+            vars(state).pop("deref_user", None)
+
+    async def start(self, *args, **kwargs):
+        # Cogs are loaded once, before connecting, so reconnects never pay for them again
+        await self.startup()
+        if os.getenv("INTENTS", "").strip().lower() == "auto":
+            self.apply_intents(self.listener_intents())
+        logger.info("Intents: %s", ", ".join(name for name, enabled in self.intents if enabled))
+        # Indexes are built in the background, so they never hold up the login,
+        # the outcome shows up with the other stages in cogstats
+        self._index_task = asyncio.create_task(self._run_stage("indexes", self.ensure_indexes, None))
+        await super().start(*args, **kwargs)
+
     async def _init_cache(self):
         """Initialize Cache"""
         await self.log.sync(int(os.getenv("LOGGING")))
         logger.info("Initialized Cache")
 
-    def startup(self):
+    @staticmethod
+    def discover_cogs() -> List[str]:
+        """Extension names of the cogs folder"""
+        return sorted(
+            f"cogs.{file[:-3]}" for file in os.listdir(ROOT_DIR + "/cogs")
+            if file.endswith(".py") and not file.startswith("_")
+        )
+
+    @staticmethod
+    def _cog_dependencies(name: str) -> List[str]:
+        """Modules a cog imports at its top level, read from its source without running it"""
+        spec = importlib.util.find_spec(name)
+        tree = ast.parse(Path(spec.origin).read_text(encoding="utf-8"))
+        modules = []
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                modules.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                modules.append(importlib.util.resolve_name("." * node.level + node.module, spec.parent))
+        return modules
+
+    @classmethod
+    def _import_cog(cls, name: str) -> float:
+        """
+        Imports what a cog depends on, returns the time it took in ms. Not the cog itself,
+        load_extension always runs the module body again and its side effects would run twice
+        """
+        start = time.perf_counter()
+        for module in cls._cog_dependencies(name):
+            importlib.import_module(module)
+        return (time.perf_counter() - start) * 1000
+
+    async def _import_cogs(self, names: List[str]) -> List[Any]:
+        """Imports the cogs on a thread pool, an import error is returned in place of the time"""
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=min(8, len(names) or 1), thread_name_prefix="cog-import") as pool:
+            return await asyncio.gather(
+                *(loop.run_in_executor(pool, self._import_cog, name) for name in names), return_exceptions=True)
+
+    async def startup(self):
+        """
+        Loads every cog once, keeping the import and setup time of each in `cog_report`.
+        With prewarm_cogs the dependencies of the cogs are first imported on a thread pool,
+        and setup is load_extension running the module body and its `setup` on top of the
+        warm imports. Otherwise load_extension does it all and is timed as setup,
+        a separate import would only run every cog body twice
+        """
+        if self._cogs_loaded:
+            return
+        self._cogs_loaded = True
         self: MainBot
         logger.line()
-        # add_views(self)
-        # logger.info(f"View are added")
-        logger.line()
-        logger.info(f"Bot Version: {self.version}", )
+        logger.info("Bot Version: %s", self.version)
         logger.info("Nextcord.py: v%s", dpy_v)
         logger.line()
-        for file in os.listdir(ROOT_DIR + "/cogs"):
-            if file.endswith(".py") and not file.startswith("_"):
-                self.load_extension(f"cogs.{file[:-3]}")
-                logger.info(f"{file[:-3]} Cog has been loaded")
-                logger.line()
+        started = time.perf_counter()
+        names = [name for name in self.discover_cogs() if name not in self.extensions]
+        imports = await self._import_cogs(names) if self.prewarm_cogs else [None] * len(names)
+        for name, imported in zip(names, imports):
+            report = self.cog_report[name] = {"import_ms": None, "setup_ms": None, "error": None}
+            if isinstance(imported, BaseException):
+                report["error"] = repr(imported)
+                logger.error("%s Cog failed to import: %r", name[5:], imported)
+                continue
+            if imported is not None:
+                report["import_ms"] = round(imported, 2)
+            start = time.perf_counter()
+            try:
+                self.load_extension(name)
+            except Exception as error:
+                report["error"] = repr(error)
+                logger.error("%s Cog failed to load: %r", name[5:], error)
+                continue
+            report["setup_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            if imported is None:
+                logger.info("%s Cog has been loaded in %.1fms", name[5:], report["setup_ms"])
+            else:
+                logger.info(
+                    "%s Cog has been loaded (import %.1fms, setup %.1fms)",
+                    name[5:], report["import_ms"], report["setup_ms"]
+                )
+            logger.line()
+        logger.info("Loaded %s cogs in %.1fms", len(names), (time.perf_counter() - started) * 1000)
+
+    def core_changed(self) -> bool:
+        """True when core, utils or main.py changed on disk since the process started"""
+        return _source_mtimes() != self._source_mtimes
+
+    @staticmethod
+    def _reload_constants():
+        """
+        Reloads core.constants and rebinds its names in every module of ours that imported them
+        with `from core.constants import ...`, so they don't keep pointing at the old values
+        """
+        constants = sys.modules["core.constants"]
+        old = {name: value for name, value in vars(constants).items() if not name.startswith("_")}
+        importlib.reload(constants)
+        # Tiers were resolved from the old role table
+        from utils.checks import invalidate_member
+        invalidate_member()
+        for module in list(sys.modules.values()):
+            if module is constants or not module.__name__.startswith(("core.", "utils.", "cogs.", "__main__")):
+                continue
+            for name, value in old.items():
+                if vars(module).get(name) is value:
+                    setattr(module, name, getattr(constants, name, value))
+
+    async def soft_restart(self) -> Tuple[float, Dict[str, str]]:
+        """
+        Reloads config, constants and every extension (loading new cogs too) without touching
+        the gateway connection or the member cache.
+        Returns the time it took in ms and the error of every extension that failed, by name
+        """
+        start = time.perf_counter()
+        await self.config.reload()
+        self.invalidate_prefixes()
+        self._reload_constants()
+        failures: Dict[str, str] = {}
+        # One broken extension must not keep the others on their old code
+        for name in list(self.extensions):
+            try:
+                self.reload_extension(name)
+            except Exception as error:
+                failures[name] = repr(getattr(error, "original", error))
+        for name in self.discover_cogs():
+            if name not in self.extensions:
+                try:
+                    self.load_extension(name)
+                except Exception as error:
+                    failures[name] = repr(getattr(error, "original", error))
+        for name, error in failures.items():
+            logger.error("Soft restart of %s failed: %s", name, error)
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info("Soft restart done in %.1fms", elapsed)
+        return elapsed, failures
+
+    def _start_stage(self, name: str, stage: Callable[[], Awaitable[Any]], timeout: float):
+        """
+        Runs `stage` as a background task, unless it is still running or already succeeded.
+        on_ready fires again on every reconnect, so only failed or timed out stages are retried
+        """
+        task = self._stage_tasks.get(name)
+        if task is not None and not task.done():
+            return
+        if self.stage_times.get(name, {}).get("status") == "ok":
+            return
+        self._stage_tasks[name] = asyncio.create_task(self._run_stage(name, stage, timeout))
+
+    async def _run_stage(self, name: str, stage: Callable[[], Awaitable[Any]], timeout: Optional[float]):
+        record = self.stage_times.setdefault(name, {"status": None, "ms": None, "runs": 0})
+        record["runs"] += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(stage(), timeout)
+            record["status"] = "ok"
+        except asyncio.TimeoutError:
+            record["status"] = "timeout"
+            logger.error("Startup stage %s timed out after %ss", name, timeout)
+        except Exception as error:
+            record["status"] = "error"
+            logger.error("Startup stage %s failed: %r", name, error)
+        record["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        logger.info("Startup stage %s: %s in %.1fms", name, record["status"], record["ms"])
+
+    async def _edit_restart_message(self):
+        """Marks the message of the restart command as done, with how long the re-exec took"""
+        restart_data = await self.config.load()
+        if "restart_msg" not in restart_data:
+            return
+        description = "***<a:verify_white:859557747648364544>Restarted!***"
+        if "restart_at" in restart_data:
+            elapsed = time.time() - restart_data["restart_at"]
+            description += f"\nReady in `{elapsed:.1f}s`"
+            logger.info("Restart to ready took %.1fs", elapsed)
+        channel = self.guild.get_channel(restart_data.get("restart_channel"))
+        if channel is not None:
+            msg = await channel.fetch_message(restart_data['restart_msg'])
+            await msg.edit(embed=Embed(color=Color.green(), description=description))
+        self.config.unset(['restart_msg', 'restart_channel', 'restart_at'])
+
+    async def _prefill_cache(self):
+        """Reads what commands need from disk and the database up front, instead of on their first use"""
+        await self.config.load()
+        if self.prefix_document is not None:
+            async for entry in self.prefix_document.iter_all():
+                self.guild_prefixes[entry["_id"]] = tuple(entry["prefixes"])
+        self.invalidate_prefixes()
 
     async def on_ready(self):
         # On ready, print some details to standard out
         # webserver()
         self.guild = self.get_guild(int(os.getenv("GUILD")))
-        await self._init_cache()
-        self.startup()
-
-        # load restart configs from locan json
-        restart_data = read_json("config")
-        if "restart_msg" in restart_data:
-            msg = await self.guild.get_channel(
-                restart_data['restart_channel']
-            ).fetch_message(restart_data['restart_msg'])
-
-            await msg.edit(embed=Embed(
-                color=Color.green(),
-                description="***<a:verify_white:859557747648364544>Restarted!***"
-            ))
-            json_unset(['restart_msg', 'restart_channel'], "config")
+        # Nothing here is awaited, the bot handles commands while these finish
+        self._start_stage("webhook", self._init_cache, timeout=30)
+        self._start_stage("restart_message", self._edit_restart_message, timeout=15)
+        self._start_stage("cache", self._prefill_cache, timeout=30)
 
         logger.line()
-        logger.info(f"Logged in as: {self.user.name} : {self.user.id}")
+        logger.info("Logged in as: %s : %s", self.user.name, self.user.id)
+
+    async def close(self):
+        # Write whatever is still buffered before the connection goes away,
+        # a store that can't be written must not keep the bot from closing
+        try:
+            results = await asyncio.gather(
+                self.config.flush(), *(document.flush() for document in self.documents), return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Flushing on close failed: %r", result)
+            await self.log.close()
+        finally:
+            # Its tick task would otherwise outlive the bot until the loop dies
+            timer_wheel.stop()
+            await super().close()
 
     @property
     def version(self):
@@ -109,17 +523,99 @@ class BaseMainBot(Bot):
 
     @property
     async def owner(self) -> Member:
-        return self.guild.get_member(self.owner_id)
+        # Not cached without the members intent or before the guild is chunked
+        return self.guild.get_member(self.owner_id) or await self.guild.fetch_member(self.owner_id)
+
+    def cache_sizes(self) -> Dict[str, int]:
+        """Number of cached objects per type, to see what the intents and cache flags cost"""
+        guilds = self.guilds
+        return {
+            "guilds": len(guilds),
+            "members": sum(len(guild.members) for guild in guilds),
+            "users": len(self.users),
+            "presences": sum(1 for guild in guilds for member in guild.members if member.activities),
+            "voice_states": sum(len(guild._voice_states) for guild in guilds),
+            "channels": sum(len(guild.channels) for guild in guilds),
+            "threads": sum(len(guild.threads) for guild in guilds),
+            "roles": sum(len(guild.roles) for guild in guilds),
+            "emojis": len(self.emojis),
+            "stickers": len(self.stickers),
+            "messages": len(self.cached_messages),
+            "documents": sum(document.cache.stats["size"] for document in self.documents if document.cache),
+        }
+
+    @property
+    def test(self) -> bool:
+        return self._test
+
+    @test.setter
+    def test(self, value: bool):
+        self._test = value
+        self.invalidate_prefixes()
+
+    @property
+    def mentions(self) -> Tuple[str, ...]:
+        """Both forms of the bot's mention, empty before login"""
+        if self._mentions is None and self.user is not None:
+            self._mentions = (f"<@{self.user.id}>", f"<@!{self.user.id}>")
+        return self._mentions or ()
+
+    def invalidate_prefixes(self):
+        """Drops the compiled prefixes, they are built again on the next message"""
+        self._compiled_prefixes.clear()
+
+    def primary_prefix(self, message=None) -> str:
+        """The first prefix that isn't a mention, for showing to users"""
+        return self.prefix_for(message)[len(self.mentions)]
 
     @property
     def prefix(self) -> str:
-        return "!"
+        return self.primary_prefix()
+
+    def prefix_for(self, message=None) -> Tuple[str, ...]:
+        """
+        Prefixes valid for `message`, mentions first. Built once per guild and reused
+        until test mode, the config or the guild prefixes change
+        """
+        if self._prefixes_config_version != self.config.version:
+            # config["prefixes"] changed, e.g. through config.upsert
+            self._compiled_prefixes.clear()
+            self._prefixes_config_version = self.config.version
+        guild = getattr(message, "guild", None)
+        key = guild.id if guild is not None and guild.id in self.guild_prefixes else None
+        compiled = self._compiled_prefixes.get(key)
+        if compiled is None:
+            base = self.guild_prefixes[key] if key is not None else self.config.get("prefixes")
+            # An empty list would leave only the mentions, and no prefix to show
+            base = base or self.DEFAULT_PREFIXES
+            compiled = (
+                *(f"{mention} " for mention in self.mentions), *base,
+                *(self.TEST_PREFIXES if self.test else ())
+            )
+            if self.user is not None:
+                self._compiled_prefixes[key] = compiled
+        return compiled
 
     async def get_prefix(self, message=None):
-        prefixes = ["!"]
-        if self.test:
-            prefixes.append("$")
-        return when_mentioned_or(*prefixes)(self, message)
+        # A tuple, so nextcord's tuple(prefix) doesn't copy it
+        return self.prefix_for(message)
+
+    async def set_guild_prefixes(self, guild_id: int, prefixes: List[str]):
+        """
+        Saves the prefixes of a guild, an empty list goes back to the default ones
+        Params:
+         - guild_id (int) : The guild to set the prefixes of
+         - prefixes (list) : The new prefixes
+        """
+        if self.prefix_document is None:
+            raise RuntimeError("Per guild prefixes are disabled, set GUILD_PREFIXES=1")
+        if prefixes:
+            await self.prefix_document.upsert(guild_id, {"prefixes": list(prefixes)})
+            self.guild_prefixes[guild_id] = tuple(prefixes)
+        else:
+            await self.prefix_document.delete(guild_id)
+            self.guild_prefixes.pop(guild_id, None)
+        self._compiled_prefixes.pop(guild_id, None)
 
 
 class MainBot(BaseMainBot):
@@ -1,21 +1,22 @@
 from dataclasses import dataclass
-from typing import List, Final
+from typing import Dict, FrozenSet, Final, Tuple
 
-STAFF_CHANNELS: List[int] = [
+# Channel groups are only used for membership tests
+STAFF_CHANNELS: FrozenSet[int] = frozenset({
     805206391877926912, 821089373214605412, 827474353036853258, 827474644318552104,
     874644809338458143, 808097124742594590, 823668719610888253, 827472306007048232,
     827473681767858176
-]
-LOUNGE_CHANNELS: List[int] = [
+})
+LOUNGE_CHANNELS: FrozenSet[int] = frozenset({
     805206377302982707, 805206379329093632, 805206382160773120, 809686110753652756,
     838961597988732958, 805930501457182746
-]
-COMMAND_CHANNELS: List[int] = [
+})
+COMMAND_CHANNELS: FrozenSet[int] = frozenset({
     805206382659502121, 805206384794533898, 874644809338458143, 808097124742594590,
-    823668719610888253, 827472306007048232, 874644809338458143, 825391611764539462,
-    824958184882962452, 827473681767858176, 806823195755282443, 824989904798220358,
-    837271163813101608, 838961597988732958
-]
+    823668719610888253, 827472306007048232, 825391611764539462, 824958184882962452,
+    827473681767858176, 806823195755282443, 824989904798220358, 837271163813101608,
+    838961597988732958
+})
 
 
 @dataclass(frozen=True)
@@ -31,6 +32,12 @@ class ROLE:
     chat_mod: Final[int] = 82168731315050907
 
 
+# Staff roles from lowest to highest, a role passes the checks of its tier and every tier below
+ROLE_TIERS: Tuple[int, ...] = (ROLE.STAFF, ROLE.MOD, ROLE.SR_MOD, ROLE.ADMIN, ROLE.MANAGER, ROLE.OWNER)
+# Role id: tier, 0 is reserved for members without a staff role
+ROLE_TIER: Dict[int, int] = {role: tier for tier, role in enumerate(ROLE_TIERS, 1)}
+
+
 @dataclass(frozen=True)
 class EMOJI:
     """
@@ -39,4 +46,6 @@ class EMOJI:
     ## Example:
         TICK: Final[str] = "<a:check:896366284239962143>"
     """
-    pass
+    TICK: Final[str] = "✅"
+    CROSS: Final[str] = "❌"
+    DOT: Final[str] = "•"
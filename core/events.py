@@ -57,14 +57,14 @@ class Events(Cog):
 
         # Implement further custom checks for errors here...
         try:
-            await self._bot.log.send(f"{ctx.channel.mention} {ctx.author} \n {error}")
+            self._bot.log.send(f"{ctx.channel.mention} {ctx.author} \n {error}")
         except TypeError:
             pass
         raise error
 
     @Cog.listener()
     async def on_error(self, event, *args, **kwargs):
-        await self._bot.log.send(f"event: {event} \n error: \n{args} \n{kwargs}")
+        self._bot.log.send(f"event: {event} \n error: \n{args} \n{kwargs}")
 
     @Cog.listener()
     async def on_message(self, message):
@@ -72,8 +72,9 @@ class Events(Cog):
             return
 
         # Whenever the bot is tagged, respond with its prefix
-        if message.content.startswith(f"<@!{self._bot.user.id}>"):
-            await message.channel.send(f":eyes: My prefix here is {self._bot.prefix}", delete_after=10)
+        if message.content.startswith(self._bot.mentions):
+            await message.channel.send(
+                f":eyes: My prefix here is {self._bot.primary_prefix(message)}", delete_after=10)
 
 
 def setup(bot):
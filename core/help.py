@@ -1,18 +1,50 @@
+import asyncio
+import time
+from collections import OrderedDict
+from copy import copy
 from random import randint
 from textwrap import dedent
+from typing import Dict, List, NamedTuple, Tuple, Any
 
 from nextcord import Embed, SelectOption
 from nextcord.ext import commands
 from nextcord.utils import as_chunks
 
-from utils.checks import is_invoked_with_command
+from utils.checks import is_invoked_with_command, dry_run
 from .constants import COMMAND_CHANNELS, EMOJI
 from .pawgenator import Paginator
 from utils.util import Raise
 
 
+class HelpEntry(NamedTuple):
+    """The parts of a command's help that don't depend on who asks"""
+    title: str
+    description: str
+    short: str
+    option: SelectOption
+
+
 class EmbedHelpCommand(commands.HelpCommand):
-    """This is an HelpCommand that utilizes embeds."""
+    """
+    This is an HelpCommand that utilizes embeds.
+    Command entries and bot help pages are rendered once per `bot.command_tree_version`
+    and prefix, and kept on the class since the help command is copied for every invocation.
+    Only the check filtering and the footer are done per request
+    """
+    max_cached_pages = 32
+    # Which commands a member may see is kept this long, per member, roles and channel
+    visible_ttl = 30.0
+    max_cached_members = 256
+
+    _version = -1
+    _entries: Dict[Tuple[str, commands.Command], HelpEntry] = {}
+    # (prefix, visible commands): (pages without footer, select options per page)
+    _pages: "OrderedDict[Tuple[str, Tuple[commands.Command, ...]], Tuple[List[Embed], List[List[SelectOption]]]]" = (
+        OrderedDict()
+    )
+
+    # (member id, roles, channel id): (expires at, command: can run)
+    _visible: "OrderedDict[Tuple[Any, ...], Tuple[float, Dict[commands.Command, bool]]]" = OrderedDict()
 
     def __init__(self):
         super().__init__()
@@ -38,39 +70,127 @@ class EmbedHelpCommand(commands.HelpCommand):
             """),
             colour=randint(0x000000, 0xFFFFFF))
 
-    async def send_bot_help(self, mapping):
-        pages, options_list = [], []
+    def _sync_cache(self):
+        """Drops everything rendered for an older command tree"""
+        cls = type(self)
+        version = self.context.bot.command_tree_version
+        if cls._version != version:
+            cls._version = version
+            cls._entries.clear()
+            cls._pages.clear()
+            cls._visible.clear()
+
+    # noinspection PyProtectedMember
+    def _visible_for(self) -> Dict[commands.Command, bool]:
+        """Check outcomes of the invoking member, empty once they are older than `visible_ttl`"""
         ctx = self.context
-        for cog, cmds in mapping.items():
+        roles = getattr(ctx.author, "_roles", None)
+        key = (ctx.author.id, roles.tobytes() if roles is not None else b"", ctx.channel.id)
+        now = time.monotonic()
+        cached = self._visible.get(key)
+        if cached is None or cached[0] < now:
+            cached = self._visible[key] = (now + self.visible_ttl, {})
+            if len(self._visible) > self.max_cached_members:
+                self._visible.popitem(last=False)
+        else:
+            self._visible.move_to_end(key)
+        return cached[1]
+
+    async def _can_run(self, command) -> bool:
+        # Every command gets its own context, can_run swaps ctx.command while it awaits
+        try:
+            return await command.can_run(copy(self.context))
+        except commands.CommandError:
+            return False
+
+    async def filter_commands(self, cmds, *, sort=False, key=None):
+        """
+        HelpCommand.filter_commands, but the checks of all commands run concurrently as a dry run
+        (see utils.checks.dry_run) and their outcomes are reused for `visible_ttl` seconds
+        """
+        if sort and key is None:
+            key = lambda c: c.name  # noqa: E731
+        iterator = list(cmds) if self.show_hidden else [c for c in cmds if not c.hidden]
+        if self.verify_checks is False or (self.verify_checks is None and not self.context.guild):
+            return sorted(iterator, key=key) if sort else iterator
+
+        self._sync_cache()
+        visible = self._visible_for()
+        missing = [c for c in iterator if c not in visible]
+        if missing:
+            token = dry_run.set(True)
+            try:
+                results = await asyncio.gather(*(self._can_run(c) for c in missing))
+            finally:
+                dry_run.reset(token)
+            visible.update(zip(missing, results))
+        ret = [c for c in iterator if visible[c]]
+        if sort:
+            ret.sort(key=key)
+        return ret
+
+    def get_entry(self, command) -> HelpEntry:
+        prefix = self.context.prefix
+        entry = self._entries.get((prefix, command))
+        if entry is None:
+            description = self.get_command_description(command)
+            entry = self._entries[(prefix, command)] = HelpEntry(
+                title=f"`{prefix}{command.name} {command.usage or ''}`",
+                description=description,
+                short=command.short_doc or command.description or "No Description",
+                option=SelectOption(value=command.name, label=command.name, description=description),
+            )
+        return entry
+
+    def _render_bot_help(self, visible) -> Tuple[List[Embed], List[List[SelectOption]]]:
+        pages, options_list = [], []
+        for cog, filtered in visible:
             cog_name = 'No Category' if cog is None else cog.qualified_name
-            filtered = await self.filter_commands(cmds, sort=True)
-            if not filtered:
-                continue
             for chunk in as_chunks(filtered, self.per_page_items):
-                options = []
-                embed = (
-                    Embed(
-                        color=randint(0x000000, 0xFFFFFF),
-                        title=f"**⚙️ {cog_name}**",
-                        description=cog.description if cog else Embed.Empty, ).set_footer(
-                        text=f"Type {ctx.prefix}help <command> for more info",
-                        icon_url=ctx.author.display_avatar.url,
-                    )
+                embed = Embed(
+                    color=randint(0x000000, 0xFFFFFF),
+                    title=f"**⚙️ {cog_name}**",
+                    description=cog.description if cog else Embed.Empty,
                 )
+                options = []
                 for c in chunk:
-                    c_usage = c.usage or ""
-                    title = f"`{ctx.prefix}{c.name} {c_usage}`"
-                    embed.add_field(
-                        name=title,
-                        value=f"{EMOJI.DOT} {self.get_command_description(c)}",
-                        inline=False)
-                    options.append(SelectOption(
-                        value=c.name, label=c.name,
-                        description=self.get_command_description(c))
-                    )
+                    entry = self.get_entry(c)
+                    embed.add_field(name=entry.title, value=f"{EMOJI.DOT} {entry.description}", inline=False)
+                    options.append(entry.option)
                 pages.append(embed)
                 options_list.append(options)
-        paginator = Paginator(channel=ctx.channel, user=ctx.author, embeds=pages)
+        return pages, options_list
+
+    async def send_bot_help(self, mapping):
+        ctx = self.context
+        self._sync_cache()
+        # One concurrent round of checks for every cog, the loop below is served from the cache
+        await self.filter_commands([c for cmds in mapping.values() for c in cmds])
+        visible = []
+        for cog, cmds in mapping.items():
+            filtered = await self.filter_commands(cmds, sort=True)
+            if filtered:
+                visible.append((cog, filtered))
+
+        key = (ctx.prefix, tuple(c for _, filtered in visible for c in filtered))
+        rendered = self._pages.get(key)
+        if rendered is None:
+            rendered = self._pages[key] = self._render_bot_help(visible)
+            if len(self._pages) > self.max_cached_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(key)
+        pages, options_list = rendered
+
+        # A shallow copy is enough, set_footer replaces the footer dict instead of editing it,
+        # Embed.copy would round trip every field through to_dict/from_dict
+        footer = f"Type {ctx.prefix}help <command> for more info"
+        icon = ctx.author.display_avatar.url
+        paginator = Paginator(
+            channel=ctx.channel, user=ctx.author,
+            embeds=lambda index: copy(pages[index]).set_footer(text=footer, icon_url=icon),
+            length=len(pages)
+        )
         await paginator.add_dropdown(options_list, self)
         await paginator.start()
 
@@ -85,14 +205,13 @@ class EmbedHelpCommand(commands.HelpCommand):
             text=f"Type {ctx.prefix}help <command> for more help",
             icon_url=ctx.author.display_avatar.url,
         )
+        self._sync_cache()
         filtered = await self.filter_commands(cog.get_commands(), sort=True)
         if not filtered:
             return await Raise(ctx, f"Command or category not found. Use {ctx.prefix}help", delete_after=10).error()
         for c in filtered:
-            desc = c.short_doc or c.description or "No Description"
-            c_usage = c.usage or ""
-            title = f"`{ctx.prefix}{c.name} {c_usage}`"
-            embed.add_field(name=title, value=f"{EMOJI.DOT} {desc}", inline=False)
+            entry = self.get_entry(c)
+            embed.add_field(name=entry.title, value=f"{EMOJI.DOT} {entry.short}", inline=False)
         await destination.send(embed=embed, delete_after=None if destination.id in COMMAND_CHANNELS else 30)
 
     async def send_group_help(self, group):
@@ -106,13 +225,12 @@ class EmbedHelpCommand(commands.HelpCommand):
             text=f"Type {ctx.prefix}help <command> for more help",
             icon_url=ctx.author.display_avatar.url,
         )
+        self._sync_cache()
         for c in sorted(set(group.commands), key=lambda cmd: cmd.name):
             if c.hidden or c.parent:
                 continue
-            desc = c.short_doc or c.description or "No Description"
-            c_usage = c.usage or ""
-            title = f"`{ctx.prefix}{c.name} {c_usage}`"
-            embed.add_field(name=title, value=f"{EMOJI.DOT} {desc}", inline=False)
+            entry = self.get_entry(c)
+            embed.add_field(name=entry.title, value=f"{EMOJI.DOT} {entry.short}", inline=False)
         await destination.send(embed=embed, delete_after=None if destination.id in COMMAND_CHANNELS else 20)
 
     async def send_command_help(self, command):
@@ -1,49 +1,154 @@
-from typing import List, Optional
+import inspect
+from collections import OrderedDict
+from typing import List, Optional, Union, Sequence, Callable, Awaitable, AsyncIterator, Tuple
 from nextcord import (
     ButtonStyle, SelectOption, Interaction, ui,
-    Embed, Message, TextChannel, Member
+    Embed, Message, TextChannel, Member, Colour
 )
+from utils.timers import WheelView
 from utils.util import Raise
 
-__all__ = ["Paginator"]
+__all__ = ["Paginator", "Pages", "PageSource", "text_source"]
+
+# A list of embeds, a (sync or async) function of the page index returning the page
+# or None past the last one, or an async iterator of the pages
+PageSource = Union[
+    Sequence[Embed],
+    Callable[[int], Union[Optional[Embed], Awaitable[Optional[Embed]]]],
+    AsyncIterator[Embed]
+]
+
+
+class Pages:
+    """
+    Renders the pages of a source when they are first shown.
+    Pages of a function are kept in a small LRU, pages of an async iterator are kept once
+    pulled, since an iterator can't go back, but it is only pulled as far as someone pages
+    Params:
+     - source (PageSource) : Where the pages come from
+     - length (int) : The page count if it is known up front, else it is found at the end
+     - cache_size (int) : Pages of a function source kept rendered
+    """
+    __slots__ = ("_source", "_length", "_rendered", "_pulled", "cache_size")
+
+    def __init__(self, source: PageSource, length: Optional[int] = None, cache_size: int = 8):
+        self._source = source
+        self._rendered: "OrderedDict[int, Embed]" = OrderedDict()
+        self._pulled: List[Embed] = []
+        self.cache_size = cache_size
+        if length is None and isinstance(source, Sequence):
+            length = len(source)
+        self._length = length
+
+    @property
+    def length(self) -> Optional[int]:
+        """The page count, None while it isn't known yet"""
+        return self._length
+
+    async def get(self, index: int) -> Optional[Embed]:
+        """The page at `index`, None when there is no such page"""
+        if index < 0 or (self._length is not None and index >= self._length):
+            return None
+        source = self._source
+        if isinstance(source, Sequence):
+            return source[index]
+        if hasattr(source, "__anext__"):
+            return await self._pull(index)
+
+        page = self._rendered.get(index)
+        if page is not None:
+            self._rendered.move_to_end(index)
+            return page
+        page = source(index)
+        if inspect.isawaitable(page):
+            page = await page
+        if page is None:
+            self._length = index
+            return None
+        self._rendered[index] = page
+        if len(self._rendered) > self.cache_size:
+            self._rendered.popitem(last=False)
+        return page
+
+    async def _pull(self, index: int) -> Optional[Embed]:
+        while len(self._pulled) <= index:
+            try:
+                self._pulled.append(await self._source.__anext__())
+            except StopAsyncIteration:
+                self._length = len(self._pulled)
+                return None
+        return self._pulled[index]
+
+
+def text_source(
+        text: str, *, size: int = 2000, title: Optional[str] = None, lang: str = "py"
+) -> Tuple[Callable[[int], Embed], int]:
+    """
+    A page source showing `text` as code blocks of `size` characters, with the page count
+    Params:
+     - text (str) : The text to page
+     - size (int) : Characters per page
+     - title (str) : Title of every page
+     - lang (str) : Code block language
+    """
+    count = max(-(-len(text) // size), 1)
+
+    def page(index: int) -> Embed:
+        return Embed(
+            color=Colour.random(),
+            title=title or Embed.Empty,
+            description=f"```{lang}\n{text[index * size:(index + 1) * size]}\n```"
+        ).set_footer(text=f"Page {index + 1}/{count}")
+
+    return page, count
 
 
 class Paginator:
-    __slots__ = ("channel", "user", "embeds", "view")
+    __slots__ = ("channel", "user", "pages", "view")
 
     def __init__(
         self,
         channel: TextChannel,
         user: Member,
-        embeds: List[Embed]
+        embeds: Optional[PageSource] = None,
+        *,
+        length: Optional[int] = None,
+        cache_size: int = 8
     ):
         self.channel = channel
         self.user = user
-        self.embeds = embeds
-        self.view = PaginatorView(self.channel, self.user, self.embeds)
+        self.pages = Pages(embeds, length, cache_size)
+        self.view = PaginatorView(self.channel, self.user, self.pages)
 
     async def start(self):
-        self.view.msg = await self.channel.send(embed=self.embeds[0], view=self.view)
+        embed = await self.pages.get(0)
+        self.view.update_label()
+        self.view.msg = await self.channel.send(embed=embed, view=self.view)
 
     async def add_dropdown(self, mapping: List[List[SelectOption]], help_command):
         self.view.add_item(SelectCommand(mapping, help_command))
 
 
-class PaginatorView(ui.View):
+class PaginatorView(WheelView):
     def __init__(
         self,
         channel: TextChannel,
         user: Member,
-        embeds: List[Embed]
+        pages: Pages
     ):
         super().__init__(timeout=30)
         self.channel = channel
         self.user = user
-        self.embeds = embeds
+        self.pages = pages
         self.index = 0
         self.msg: Optional[Message] = None
-        self.add_item(
-            ui.Button(custom_id="page_count", label=f"Page {self.index + 1}/{len(self.embeds)}", disabled=True))
+        self.add_item(ui.Button(custom_id="page_count", label="Page 1", disabled=True))
+
+    def update_label(self):
+        total = self.pages.length if self.pages.length is not None else "?"
+        for item in self.children:
+            if isinstance(item, ui.Button) and item.custom_id == "page_count":
+                item.label = f"Page {self.index + 1}/{total}"
 
     async def interaction_check(self, interaction) -> bool:
         if interaction.channel_id == self.channel.id and self.user.id == interaction.user.id:
@@ -51,33 +156,35 @@ class PaginatorView(ui.View):
         await Raise(interaction, "You can't use this button").error()
         return False
 
-    async def button_callback(self, inter: Interaction):
+    async def button_callback(self, inter: Interaction, embed: Optional[Embed] = None):
+        if embed is None:
+            embed = await self.pages.get(self.index)
+        self.update_label()
         for item in self.children:
-            if isinstance(item, ui.Button) and item.custom_id == "page_count":
-                item.label = f"Page {self.index + 1}/{len(self.embeds)}"
             if isinstance(item, SelectCommand) and item.custom_id == "command_paginator_dropdown":
                 item.update_options(self.index)
 
-        await inter.response.edit_message(
-            embed=self.embeds[self.index], view=self)
+        await inter.response.edit_message(embed=embed, view=self)
 
     @ui.button(emoji="⬅️", style=ButtonStyle.gray)
     async def button_left_callback(self, button: ui.Button, inter: Interaction):
-        if self.index == 0:
-            self.index = len(self.embeds) - 1
-        else:
+        if self.index > 0:
             self.index -= 1
+        elif self.pages.length is not None:
+            # Wrapping around needs the last page, unknown until the source ran out
+            self.index = self.pages.length - 1
 
         await self.button_callback(inter)
 
     @ui.button(emoji="➡️", style=ButtonStyle.gray)
     async def button_right_callback(self, button: ui.Button, inter: Interaction):
-        if self.index == len(self.embeds) - 1:
+        embed = await self.pages.get(self.index + 1)
+        if embed is None:
             self.index = 0
         else:
             self.index += 1
 
-        await self.button_callback(inter)
+        await self.button_callback(inter, embed)
 
     @ui.button(emoji="🗑", style=ButtonStyle.red)
     async def button_delete_callback(self, button: ui.Button, inter: Interaction):
@@ -86,7 +193,7 @@ class PaginatorView(ui.View):
 
     async def on_timeout(self) -> None:
         self.clear_items()
-        await self.msg.edit(embed=self.embeds[self.index], view=self)
+        await self.msg.edit(embed=await self.pages.get(self.index), view=self)
 
 
 class SelectCommand(ui.Select):
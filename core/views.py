@@ -1,13 +1,29 @@
-from typing import Union, List, Optional
+import asyncio
+import inspect
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Union, List, Optional, Dict, Any, Callable, Awaitable, Tuple, Set, TYPE_CHECKING
 
-from nextcord import ui, PartialEmoji, Emoji, Message, Interaction, ButtonStyle
+from nextcord import ui, PartialEmoji, Emoji, Message, Interaction, ButtonStyle, Embed, InteractionType, User, Member
+from nextcord.abc import Messageable
 from nextcord.ext.commands import Context
 
 from .constants import EMOJI
+from .pawgenator import text_source
+from utils.timers import WheelView, timer_wheel
 from utils.util import Raise
 
-# if TYPE_CHECKING:
-#     from .bot import MainBot
+if TYPE_CHECKING:
+    from utils.mongo import Document
+
+__all__ = [
+    "SingleLink", "YesNo", "ViewStateStore", "ViewDispatcher", "custom_id", "parse_custom_id"
+]
+
+# Custom ids of persistent views: "pv:<view type>:<state key>:<action>:<page>"
+CUSTOM_ID_PREFIX = "pv"
 
 
 class SingleLink(ui.View):
@@ -17,7 +33,7 @@ class SingleLink(ui.View):
 
 
 # noinspection PyUnusedLocal
-class YesNo(ui.View):
+class YesNo(WheelView):
     children: List[ui.Button]
 
     def __init__(self, ctx: Optional[Context] = None):
@@ -53,6 +69,257 @@ class YesNo(ui.View):
         self.value = False
         self.stop()
 
-# # Persistent view objects add here
-# def add_views(bot: 'MainBot'):
-#     pass
+
+def custom_id(kind: str, key: str, action: str, page: int = 0) -> str:
+    return f"{CUSTOM_ID_PREFIX}:{kind}:{key}:{action}:{page}"
+
+
+def parse_custom_id(value: str) -> Optional[Tuple[str, str, str, int]]:
+    """(view type, state key, action, page) of a persistent view custom id, None for any other id"""
+    parts = value.split(":")
+    if len(parts) != 5 or parts[0] != CUSTOM_ID_PREFIX or not parts[4].isdigit():
+        return None
+    return parts[1], parts[2], parts[3], int(parts[4])
+
+
+class ViewStateStore:
+    """
+    State of the persistent views by key, the `max_size` most recently used kept in memory.
+    With a Document every state is written through as well, so views keep working
+    after they fall out of memory or the bot restarts. States carry their `expires`
+    timestamp, written as an `expires_at` date for the collection's TTL index
+    Params:
+     - max_size (int) : States kept in memory
+     - document (Document) : Optional collection backing the states
+    """
+    __slots__ = ("max_size", "document", "_states")
+
+    def __init__(self, max_size: int = 10_000, document: Optional["Document"] = None):
+        self.max_size = max_size
+        self.document = document
+        self._states: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _remember(self, key: str, state: Dict[str, Any]):
+        self._states[key] = state
+        self._states.move_to_end(key)
+        if len(self._states) > self.max_size:
+            self._states.popitem(last=False)
+
+    async def put(self, state: Dict[str, Any], persist: bool = True) -> str:
+        """Stores a new state, returns its key. With `persist` False it is only kept in memory"""
+        key = secrets.token_urlsafe(6)
+        self._remember(key, state)
+        if persist and self.document is not None:
+            await self.document.upsert(
+                key, {**state, "expires_at": datetime.fromtimestamp(state["expires"], timezone.utc)})
+        return key
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        state = self._states.get(key)
+        if state is not None:
+            self._states.move_to_end(key)
+            return state
+        if self.document is None:
+            return None
+        state = await self.document.find(key)
+        if state is not None:
+            state.pop("_id", None)
+            state.pop("expires_at", None)
+            self._remember(key, state)
+        return state
+
+    def forget(self, key: str):
+        """Drops the state from memory only, the Document copy stays"""
+        self._states.pop(key, None)
+
+    async def delete(self, key: str):
+        self._states.pop(key, None)
+        if self.document is not None:
+            await self.document.delete(key)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+# (interaction, state, action, page, key)
+Handler = Callable[[Interaction, Dict[str, Any], str, int, str], Awaitable[None]]
+# (state data, page index): page, or None past the last one
+Renderer = Callable[[Dict[str, Any], int], Union[Optional[Embed], Awaitable[Optional[Embed]]]]
+# (interaction, answer, state data)
+Callback = Callable[[Interaction, bool, Dict[str, Any]], Awaitable[None]]
+
+
+def render_text(data: Dict[str, Any], index: int) -> Embed:
+    """Renderer of text_source pages, data holds its arguments"""
+    return text_source(data["text"], size=data.get("size", 2000), title=data.get("title"))[0](index)
+
+
+class ViewDispatcher:
+    """
+    Handles the components of every persistent view, from the bot's single on_interaction listener.
+    Nothing is kept per message but a state dict, buttons carry the view type, the state key
+    and the page in their custom id, so a view works for as long as its state exists.
+    Paginators render pages with a named renderer and yes/no prompts answer a named callback
+    or a `wait_answer` in the same process, since neither functions nor futures survive a restart
+    Params:
+     - store (ViewStateStore) : Where the states are kept
+    """
+
+    def __init__(self, store: ViewStateStore):
+        self.store = store
+        self._handlers: Dict[str, Handler] = {}
+        self.renderers: Dict[str, Renderer] = {"text": render_text}
+        self.callbacks: Dict[str, Callback] = {}
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._answering: Set[str] = set()  # Prompts whose state is being deleted
+        self.register("pg", self._paginate)
+        self.register("yn", self._answer)
+
+    def register(self, kind: str, handler: Handler):
+        """Routes the components with view type `kind` to `handler`"""
+        self._handlers[kind] = handler
+
+    async def dispatch(self, interaction: Interaction):
+        if interaction.type is not InteractionType.component:
+            return
+        parsed = parse_custom_id((interaction.data or {}).get("custom_id", ""))
+        if parsed is None:
+            return
+        kind, key, action, page = parsed
+        handler = self._handlers.get(kind)
+        if handler is None:
+            return
+        state = await self.store.get(key)
+        if state is None or state["expires"] < time.time():
+            return await Raise(interaction, "This has expired, run the command again").info()
+        if interaction.user.id != state["user"]:
+            return await Raise(interaction, "You can't use this button").error()
+        await handler(interaction, state, action, page, key)
+
+    # Paginator
+
+    async def render(self, state: Dict[str, Any], index: int) -> Optional[Embed]:
+        page = self.renderers[state["renderer"]](state["data"], index)
+        if inspect.isawaitable(page):
+            page = await page
+        return page
+
+    @staticmethod
+    def paginator_components(key: str, page: int, length: int) -> ui.View:
+        # Only a component layout, prevent_update keeps nextcord from storing it per message
+        # Custom ids must be unique within a message, so the buttons differ by action and not only by page
+        view = ui.View(timeout=None, prevent_update=False)
+        if length > 1:
+            view.add_item(ui.Button(
+                emoji="⬅️", style=ButtonStyle.gray, custom_id=custom_id("pg", key, "prev", (page - 1) % length)))
+        view.add_item(ui.Button(
+            label=f"Page {page + 1}/{length}", disabled=True, custom_id=custom_id("pg", key, "count", page)))
+        if length > 1:
+            view.add_item(ui.Button(
+                emoji="➡️", style=ButtonStyle.gray, custom_id=custom_id("pg", key, "next", (page + 1) % length)))
+        view.add_item(ui.Button(emoji="🗑", style=ButtonStyle.red, custom_id=custom_id("pg", key, "close", page)))
+        return view
+
+    async def paginate(
+            self, channel: Messageable, user: Union[User, Member], renderer: str, data: Dict[str, Any],
+            length: int, *, ttl: float = 3600, persist: bool = True) -> Message:
+        """
+        Sends page one of a persistent paginator
+        Params:
+         - renderer (str) : Name of the renderer in `self.renderers`
+         - data (dict) : What the renderer gets, must be json/bson serializable with a Document
+         - length (int) : The page count
+         - ttl (float) : Seconds the buttons work for
+         - persist (bool) : Write the state to the Document, False for data that is large or
+           private, like whole texts, which then stop paging on a restart
+        """
+        state = {"user": user.id, "renderer": renderer, "data": data, "length": length, "expires": time.time() + ttl}
+        key = await self.store.put(state, persist=persist)
+        timer_wheel.schedule(ttl, self.store.forget, key)
+        return await channel.send(embed=await self.render(state, 0), view=self.paginator_components(key, 0, length))
+
+    async def _paginate(self, interaction: Interaction, state: Dict[str, Any], action: str, page: int, key: str):
+        if action == "close":
+            await self.store.delete(key)
+            return await interaction.response.edit_message(view=None)
+        await interaction.response.edit_message(
+            embed=await self.render(state, page), view=self.paginator_components(key, page, state["length"]))
+
+    # Yes/No prompt
+
+    @staticmethod
+    def yes_no_components(key: str, disabled: bool = False) -> ui.View:
+        view = ui.View(timeout=None, prevent_update=False)
+        view.add_item(ui.Button(
+            style=ButtonStyle.green, emoji=EMOJI.TICK, label='\u200b', disabled=disabled,
+            custom_id=custom_id("yn", key, "yes")))
+        view.add_item(ui.Button(
+            style=ButtonStyle.red, emoji=EMOJI.CROSS, label='\u200b', disabled=disabled,
+            custom_id=custom_id("yn", key, "no")))
+        return view
+
+    async def ask(
+            self, channel: Messageable, user: Union[User, Member], embed: Embed, *,
+            callback: Optional[str] = None, data: Optional[Dict[str, Any]] = None, ttl: float = 30) -> str:
+        """
+        Sends a persistent yes/no prompt, returns its key for `wait_answer`
+        Params:
+         - callback (str) : Name of the callback in `self.callbacks` answering it, else use `wait_answer`
+         - data (dict) : What the callback gets
+         - ttl (float) : Seconds the buttons work for
+        """
+        state = {"user": user.id, "callback": callback, "data": data or {}, "expires": time.time() + ttl}
+        key = await self.store.put(state)
+        timer_wheel.schedule(ttl, self._expire, key)
+        if callback is None:
+            self._waiters[key] = asyncio.get_running_loop().create_future()
+        await channel.send(embed=embed, view=self.yes_no_components(key))
+        return key
+
+    async def wait_answer(self, key: str, timeout: Optional[float] = 30) -> Optional[bool]:
+        """The answer of a prompt sent without a callback, None when it timed out"""
+        future = self._waiters.get(key)
+        if future is None:
+            return None
+        timer = timer_wheel.schedule(timeout, self._resolve, future, None) if timeout is not None else None
+        try:
+            return await future
+        finally:
+            if timer is not None:
+                timer.cancel()
+            self._waiters.pop(key, None)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, value: Optional[bool]):
+        if not future.done():
+            future.set_result(value)
+
+    def _expire(self, key: str):
+        # An unanswered prompt, wake its waiter with None and free the memory of the state
+        future = self._waiters.pop(key, None)
+        if future is not None:
+            self._resolve(future, None)
+        self.store.forget(key)
+
+    async def _answer(self, interaction: Interaction, state: Dict[str, Any], action: str, page: int, key: str):
+        # Claimed before awaiting anything, so of two quick clicks only the first one answers
+        if key in self._answering:
+            return await Raise(interaction, "This has already been answered").info()
+        self._answering.add(key)
+        self.store.forget(key)
+        value = action == "yes"
+        try:
+            # Discord wants a response within 3 seconds, the state is deleted after
+            if value:
+                await interaction.response.edit_message(view=self.yes_no_components(key, disabled=True))
+            else:
+                await Raise(interaction, "Interaction cancelled, Let's pretend nothing happened 🙄", edit=True).info()
+            await self.store.delete(key)
+        finally:
+            self._answering.discard(key)
+        future = self._waiters.get(key)
+        if future is not None:
+            # Left in place for wait_answer, which may not have started waiting yet
+            self._resolve(future, value)
+        elif state["callback"] in self.callbacks:
+            await self.callbacks[state["callback"]](interaction, value, state["data"])
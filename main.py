@@ -1,14 +1,14 @@
 import argparse
-import functools
 import os
 import sys
+import time
 
 from nextcord import DiscordException, Status, Activity, ActivityType, Embed, Color
 from nextcord.ext.commands import check
 
 from core.bot import BaseMainBot
+from utils import logging
 from utils.checks import is_manager
-from utils.json import json_upsert
 
 parser = argparse.ArgumentParser()
 parser.add_argument("id", nargs='?', default=None)
@@ -18,7 +18,11 @@ bot = BaseMainBot()
 
 @bot.command(aliases=["restart"], description="Restart the bot")
 @check(is_manager)
-async def _restart(ctx):
+async def _restart(ctx, mode: str = "auto"):
+    """
+    Reloads cogs, config and constants in place. The process is only re-executed when
+    core, utils or main.py changed, or with `restart hard`
+    """
     try:
         await ctx.message.delete()
     except DiscordException:
@@ -31,10 +35,30 @@ async def _restart(ctx):
         color=Color.brand_red(),
         description=f"***🔄 Restarting...***"
     ))
-    json_upsert({"restart_msg": msg.id}, "config")
-    bot.loop.run_in_executor(None, functools.partial(os.system, "python3 restart.py " + str(ctx.channel.id)))
-    await bot.close()
-    sys.exit(0)
+    if mode == "hard" or bot.core_changed():
+        bot.config.upsert({"restart_msg": msg.id, "restart_channel": ctx.channel.id, "restart_at": time.time()})
+        await bot.close()
+        logging.shutdown()
+        os.execv(sys.executable, [sys.executable, *sys.argv])
+
+    try:
+        elapsed, failures = await bot.soft_restart()
+    except Exception as error:
+        await msg.edit(embed=Embed(color=Color.brand_red(), description=f"***Restart failed***\n`{error!r}`"))
+        raise
+    finally:
+        await bot.change_presence(status=Status.online, activity=bot.activity)
+    embed = Embed(
+        color=Color.orange() if failures else Color.green(),
+        description=f"***<a:verify_white:859557747648364544>Restarted!***\nReady in `{elapsed:.0f}ms`"
+    )
+    if failures:
+        embed.add_field(
+            name="Failed to load",
+            value="\n".join(f"`{name}`: {error}" for name, error in failures.items())[:1024],
+            inline=False
+        )
+    await msg.edit(embed=embed)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+"""
+Benchmark of the bot help render time, the old EmbedHelpCommand (every page rebuilt
+and every check awaited in turn per call) against the cached one, cold (rendered pages
+and check outcomes dropped before each call) and warm.
+
+    python test/bench_help.py --commands 240 --calls 200
+    python test/bench_help.py --check-ms 1  # checks that wait on I/O, like a first is_owner
+
+Discord is not involved, sending the pages is a no-op.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from random import randint
+from statistics import quantiles
+from types import SimpleNamespace
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+os.environ.setdefault("mongo", "memory://")
+
+from nextcord import Embed, SelectOption  # noqa: E402
+from nextcord.ext.commands import Cog, Command, HelpCommand, check  # noqa: E402
+from nextcord.utils import as_chunks  # noqa: E402
+
+import core.help  # noqa: E402
+from core.bot import BaseMainBot  # noqa: E402
+from core.constants import EMOJI  # noqa: E402
+from core.help import EmbedHelpCommand  # noqa: E402
+
+COMMANDS_PER_COG = 20
+
+
+class LegacyHelpCommand(EmbedHelpCommand):
+    """
+    send_bot_help as it was, building every embed and select option on each call,
+    with nextcord's filter_commands awaiting every check one after another
+    """
+    filter_commands = HelpCommand.filter_commands
+
+    async def send_bot_help(self, mapping):
+        pages, options_list = [], []
+        ctx = self.context
+        for cog, cmds in mapping.items():
+            cog_name = 'No Category' if cog is None else cog.qualified_name
+            filtered = await self.filter_commands(cmds, sort=True)
+            if not filtered:
+                continue
+            for chunk in as_chunks(filtered, self.per_page_items):
+                options = []
+                embed = (
+                    Embed(
+                        color=randint(0x000000, 0xFFFFFF),
+                        title=f"**⚙️ {cog_name}**",
+                        description=cog.description if cog else Embed.Empty, ).set_footer(
+                        text=f"Type {ctx.prefix}help <command> for more info",
+                        icon_url=ctx.author.display_avatar.url,
+                    )
+                )
+                for c in chunk:
+                    c_usage = c.usage or ""
+                    title = f"`{ctx.prefix}{c.name} {c_usage}`"
+                    embed.add_field(
+                        name=title,
+                        value=f"{EMOJI.DOT} {self.get_command_description(c)}",
+                        inline=False)
+                    options.append(SelectOption(
+                        value=c.name, label=c.name,
+                        description=self.get_command_description(c))
+                    )
+                pages.append(embed)
+                options_list.append(options)
+        await NullPaginator(pages).add_dropdown(options_list, self)
+
+
+class NullPaginator:
+    """Stands in for core.pawgenator.Paginator, which needs a Discord channel"""
+
+    def __init__(self, embeds: List[Embed], **_):
+        self.embeds = embeds
+
+    async def add_dropdown(self, mapping, help_command):
+        pass
+
+    async def start(self):
+        pass
+
+
+CHECK_DELAY = 0.0
+
+
+async def allowed(_ctx) -> bool:
+    if CHECK_DELAY:
+        await asyncio.sleep(CHECK_DELAY)
+    return True
+
+
+def bench_command(index: int) -> Command:
+    async def callback(self, ctx):
+        pass
+    command = Command(callback, name=f"command{index}", description=f"Does thing number {index}")
+    return check(allowed)(command) if index % 2 else command
+
+
+def build_bot(commands: int) -> BaseMainBot:
+    bot = BaseMainBot()
+    for cog_index in range(0, commands, COMMANDS_PER_COG):
+        attrs = {
+            f"command{index}": bench_command(index)
+            for index in range(cog_index, min(cog_index + COMMANDS_PER_COG, commands))
+        }
+        cog = type(f"Bench{cog_index // COMMANDS_PER_COG}", (Cog,), {"__doc__": "Benchmark commands", **attrs})
+        bot.add_cog(cog())
+    return bot
+
+
+def make_help(cls, bot: BaseMainBot):
+    help_command = cls()
+    help_command._command_impl = SimpleNamespace(_parse_arguments=None)
+    help_command.context = SimpleNamespace(
+        bot=bot, prefix="!", command=None, guild=None, channel=SimpleNamespace(id=1),
+        author=SimpleNamespace(id=1, display_avatar=SimpleNamespace(url="https://cdn.example/avatar.png")),
+    )
+    return help_command
+
+
+def mapping_of(bot: BaseMainBot) -> Dict:
+    mapping = {cog: cog.get_commands() for cog in bot.cogs.values()}
+    mapping[None] = [c for c in bot.commands if c.cog is None]
+    return mapping
+
+
+async def measure(calls: int, help_command, mapping, cold: bool) -> Dict[str, float]:
+    latencies = []
+    for _ in range(calls):
+        if cold:
+            EmbedHelpCommand._version = -1
+        start = time.perf_counter()
+        await help_command.send_bot_help(mapping)
+        latencies.append(time.perf_counter() - start)
+    cuts = quantiles(latencies, n=100, method="inclusive")
+    return {
+        "calls": calls,
+        "p50_ms": round(cuts[49] * 1000, 4),
+        "p99_ms": round(cuts[98] * 1000, 4),
+        "mean_ms": round(sum(latencies) / calls * 1000, 4),
+    }
+
+
+async def main(args: argparse.Namespace) -> Dict:
+    global CHECK_DELAY
+    CHECK_DELAY = args.check_ms / 1000
+    core.help.Paginator = NullPaginator
+    bot = build_bot(args.commands)
+    mapping = mapping_of(bot)
+    try:
+        return {
+            "commands": len(bot.commands),
+            "check_ms": args.check_ms,
+            "legacy": await measure(args.calls, make_help(LegacyHelpCommand, bot), mapping, cold=False),
+            "cached_cold": await measure(args.calls, make_help(EmbedHelpCommand, bot), mapping, cold=True),
+            "cached_warm": await measure(args.calls, make_help(EmbedHelpCommand, bot), mapping, cold=False),
+        }
+    finally:
+        await bot.session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=240, help="Commands to register, 200+ is our size")
+    parser.add_argument("--calls", type=int, default=200, help="Help renders per variant")
+    parser.add_argument("--check-ms", type=float, default=0, help="Time every other command's check waits")
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=4))
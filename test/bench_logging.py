@@ -0,0 +1,85 @@
+"""
+Micro-benchmark of BotLogger call cost, eager colorizing (the old BotLogger) against
+the lazy ColorFormatter, for filtered out debug calls and written info calls.
+
+    python test/bench_logging.py --calls 200000
+"""
+import argparse
+import json
+import logging
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from colorama import Fore, Style  # noqa: E402
+
+from utils.logging import BotLogger, ColorFormatter  # noqa: E402
+
+
+class EagerLogger(logging.Logger):
+    """BotLogger as it was, coloring the message before checking anything else"""
+
+    @staticmethod
+    def _debug_(*msgs):
+        return f'{Fore.CYAN}{" ".join(msgs)}{Style.RESET_ALL}'
+
+    @staticmethod
+    def _info_(*msgs):
+        return f'{Fore.LIGHTMAGENTA_EX}{" ".join(msgs)}{Style.RESET_ALL}'
+
+    def debug(self, msg, *args, **kwargs):
+        if self.isEnabledFor(logging.DEBUG):
+            self._log(logging.DEBUG, self._debug_(msg), args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        if self.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, self._info_(msg), args, **kwargs)
+
+
+class NullStreamHandler(logging.Handler):
+    """Formats like the console handler would, but writes nowhere"""
+
+    def emit(self, record):
+        self.format(record)
+
+
+def build(cls, formatter: logging.Formatter) -> logging.Logger:
+    logger = cls(f"bench.{cls.__name__}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = NullStreamHandler()
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    return logger
+
+
+def per_call_ns(statement, calls: int) -> float:
+    return min(timeit.repeat(statement, number=calls, repeat=5)) / calls * 1e9
+
+
+def main(calls: int):
+    fmt = "%(asctime)s %(name)s[%(lineno)d] - %(levelname)s: %(message)s"
+    eager = build(EagerLogger, logging.Formatter(fmt))
+    lazy = build(BotLogger, ColorFormatter(fmt))
+    payload = {"guild": 805206226769674290, "members": list(range(20))}
+
+    return {
+        "calls": calls,
+        "filtered_debug_ns": {
+            # Old call sites built the f-string before the level check could filter it out
+            "eager": per_call_ns(lambda: eager.debug(f"payload {payload}"), calls),
+            "lazy": per_call_ns(lambda: lazy.debug("payload %s", payload), calls),
+        },
+        "written_info_ns": {
+            "eager": per_call_ns(lambda: eager.info(f"payload {payload}"), calls // 10),
+            "lazy": per_call_ns(lambda: lazy.info("payload %s", payload), calls // 10),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200_000)
+    print(json.dumps(main(parser.parse_args().calls), indent=4))
@@ -0,0 +1,129 @@
+"""
+Benchmarks of utils.mongo.Document operations.
+
+Runs against the in-memory backend by default, or a real server with --uri:
+
+    python test/bench_mongo.py --sizes 1000 10000 100000 --output bench.json
+    python test/bench_mongo.py --uri mongodb://localhost:27017 --cache 1024 --write-behind
+
+Results are printed as json (throughput and p50/p99 latency per operation and
+document count), so runs of different versions can be diffed.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+from statistics import quantiles
+from typing import Any, Awaitable, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from utils.mongo import Document  # noqa: E402
+from utils.mongo_memory import MemoryClient  # noqa: E402
+
+COLLECTION = "bench_documents"
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    total = sum(latencies)
+    if len(latencies) > 1:
+        cuts = quantiles(latencies, n=100, method="inclusive")
+        p50, p99 = cuts[49], cuts[98]
+    else:
+        p50 = p99 = latencies[0]
+    return {
+        "calls": len(latencies),
+        "ops_per_sec": round(len(latencies) / total, 1) if total else float("inf"),
+        "p50_ms": round(p50 * 1000, 4),
+        "p99_ms": round(p99 * 1000, 4),
+    }
+
+
+async def measure(calls: int, operation: Callable[[int], Awaitable[Any]]) -> Dict[str, float]:
+    latencies = []
+    for index in range(calls):
+        start = time.perf_counter()
+        await operation(index)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+async def seed(document: Document, size: int) -> None:
+    await document.delete_many()
+    for start in range(0, size, 10_000):
+        await document.bulk_update(
+            {"_id": _id, "xp": _id % 1000, "level": _id % 50, "name": f"user{_id}"}
+            for _id in range(start, min(start + 10_000, size))
+        )
+
+
+async def bench_size(document: Document, size: int, calls: int) -> Dict[str, Any]:
+    rng = random.Random(size)
+    ids = [rng.randrange(size) for _ in range(calls)]
+    await seed(document, size)
+
+    results = {
+        "find": await measure(calls, lambda i: document.find(ids[i])),
+        "upsert": await measure(calls, lambda i: document.upsert(ids[i], {"name": f"renamed{i}"})),
+        "increment": await measure(calls, lambda i: document.increment(ids[i], {"xp": 1})),
+        "bulk_update": await measure(max(calls // 100, 1), lambda i: document.bulk_update(
+            {"_id": _id, "level": i} for _id in ids[(i * 100) % calls:(i * 100) % calls + 100])),
+        "find_many": await measure(max(calls // 10, 1), lambda i: document.find_many(
+            {"xp": {"$gte": i % 1000}}, sort={"xp": -1}, limit=10)),
+        "get_all": await measure(3 if size <= 100_000 else 1, lambda i: document.get_all()),
+    }
+    await document.flush()
+    if document.cache is not None:
+        results["cache"] = document.cache.stats
+        document.cache.hits = document.cache.misses = document.cache.evictions = 0
+    return results
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.uri:
+        import motor.motor_asyncio
+        client = motor.motor_asyncio.AsyncIOMotorClient(args.uri)
+    else:
+        client = MemoryClient()
+    document = Document(
+        client["benchmark"], COLLECTION,
+        cache_size=args.cache, write_behind=args.write_behind
+    )
+    report: Dict[str, Any] = {
+        "backend": "mongod" if args.uri else "memory",
+        "python": platform.python_version(),
+        "cache_size": args.cache,
+        "write_behind": args.write_behind,
+        "calls": args.calls,
+        "sizes": {}
+    }
+    try:
+        for size in args.sizes:
+            report["sizes"][str(size)] = await bench_size(document, size, args.calls)
+            print(f"{size} documents done", file=sys.stderr)
+    finally:
+        await document.delete_many()
+        client.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", help="MongoDB uri, the in-memory backend is used when left out")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="Document counts to benchmark, up to 1000000")
+    parser.add_argument("--calls", type=int, default=2_000, help="Calls per single document operation")
+    parser.add_argument("--cache", type=int, default=0, help="Document cache size, 0 disables it")
+    parser.add_argument("--write-behind", action="store_true", help="Batch increment/upsert writes")
+    parser.add_argument("--output", help="Write the json report to this file instead of stdout")
+    arguments = parser.parse_args()
+
+    result = json.dumps(asyncio.run(main(arguments)), indent=4)
+    if arguments.output:
+        Path(arguments.output).write_text(result)
+    else:
+        print(result)
@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+os.environ.setdefault("mongo", "memory://")
+
+from utils.mongo import Document  # noqa: E402
+from utils.mongo_memory import MemoryClient  # noqa: E402
+
+
+def test_failed_set_is_retried_before_newer_inc():
+    async def run():
+        document = Document(MemoryClient()["test"], "docs", write_behind=True, flush_interval=60)
+        bulk_write = document.db.bulk_write
+        failures = [ConnectionError("mongo is down")]
+
+        async def flaky_bulk_write(*args, **kwargs):
+            await asyncio.sleep(0)
+            if failures:
+                raise failures.pop()
+            return await bulk_write(*args, **kwargs)
+
+        document.db.bulk_write = flaky_bulk_write
+        await document.upsert(2, {"x": 1})
+        flush = asyncio.create_task(document.flush())
+        await asyncio.sleep(0)
+        await document.increment(2, {"x": 5})
+        await flush
+        await document.flush()
+        return await document.find(2)
+
+    assert asyncio.run(run()) == {"_id": 2, "x": 6}
+
+
+def test_plan_query_sorts_before_grouping():
+    from utils.mongo import plan_query
+
+    plan = plan_query(
+        {"guild": 1}, sort={"xp": -1}, skip=2, limit=5,
+        group={"_id": "$guild", "top": {"$first": "$xp"}}, projection={"top": 1})
+    assert [next(iter(stage)) for stage in plan.pipeline] == [
+        "$match", "$sort", "$skip", "$group", "$limit", "$project"
+    ]
+    assert plan_query({"guild": 1}, sort={"xp": -1}, limit=5).kind == "find"
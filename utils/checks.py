@@ -5,16 +5,85 @@ and you can execute the command.
 Certain permissions signify if the person is a moderator (Manage Server) or an
 admin (Administrator). Having these signify certain bypasses.
 Of course, the owner will always be able to execute commands."""
-from typing import Union, Optional, List
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Union, Optional, Dict, Tuple, Any, Hashable
 
-from nextcord import DMChannel, DiscordException, Message, TextChannel
+from nextcord import DMChannel, DiscordException, Message, TextChannel, Member, User
 from nextcord.ext.commands import Context, check
 
-from core.constants import COMMAND_CHANNELS, ROLE
+from core.constants import COMMAND_CHANNELS, ROLE, ROLE_TIER
 from .util import Raise
 
-
-async def check_permissions(ctx: Context, perms, *, checks=all):
+# True while checks are only evaluated, not enforced, e.g. when the help command lists
+# what a member can run. Checks must not message or delete anything then
+dry_run: ContextVar[bool] = ContextVar("dry_run", default=False)
+
+# Member id: (roles the tier was resolved from, highest staff tier)
+_member_tiers: Dict[int, Tuple[bytes, int]] = {}
+
+
+class CheckCache:
+    """
+    Outcomes of checks that only depend on who runs them, with which roles, and where.
+    Keys hold the author's roles, so a role change never hits an old outcome,
+    `invalidate` is for what the key can't see (permission overwrites, role edits)
+    Params:
+     - max_size (int) : Outcomes kept, least recently used ones are dropped first
+    """
+    __slots__ = ("max_size", "_results", "hits", "misses")
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._results: "OrderedDict[Tuple[Any, ...], bool]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # noinspection PyProtectedMember
+    @staticmethod
+    def key(ctx: Context, check_key: Hashable) -> Tuple[Any, ...]:
+        roles = getattr(ctx.author, "_roles", None)
+        return check_key, ctx.author.id, roles.tobytes() if roles is not None else b"", ctx.channel.id
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[bool]:
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def set(self, key: Tuple[Any, ...], result: bool) -> bool:
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+        return result
+
+    def invalidate(self, member_id: Optional[int] = None):
+        """Drops the outcomes of a member, or all of them without `member_id`"""
+        if member_id is None:
+            self._results.clear()
+            return
+        for key in [key for key in self._results if key[1] == member_id]:
+            del self._results[key]
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "size": len(self._results),
+        }
+
+
+check_cache = CheckCache()
+
+
+async def _check_permissions(ctx: Context, perms, checks) -> bool:
     is_owner = await ctx.bot.is_owner(ctx.author)
     if is_owner:
         return True
@@ -23,6 +92,14 @@ async def check_permissions(ctx: Context, perms, *, checks=all):
     return checks(getattr(resolved, name, None) == value for name, value in perms.items())
 
 
+async def check_permissions(ctx: Context, perms, *, checks=all):
+    key = check_cache.key(ctx, ("permissions", checks, tuple(sorted(perms.items()))))
+    result = check_cache.get(key)
+    if result is None:
+        result = check_cache.set(key, await _check_permissions(ctx, perms, checks))
+    return result
+
+
 def has_permissions(*, checks=all, **perms):
     async def pred(ctx):
         return await check_permissions(ctx, perms, checks=checks)
@@ -31,12 +108,12 @@ def has_permissions(*, checks=all, **perms):
 
 
 def is_invoked_with_command(ctx: Union[Context, Message]):
-    if isinstance(ctx, Message):
+    if isinstance(ctx, Message) or dry_run.get():
         return False
     return ctx.valid and ctx.invoked_with in (*ctx.command.aliases, ctx.command.name)
 
 
-async def check_guild_permissions(ctx, perms, *, checks=all):
+async def _check_guild_permissions(ctx: Context, perms, checks) -> bool:
     is_owner = await ctx.bot.is_owner(ctx.author)
     if is_owner:
         return True
@@ -48,6 +125,14 @@ async def check_guild_permissions(ctx, perms, *, checks=all):
     return checks(getattr(resolved, name, None) == value for name, value in perms.items())
 
 
+async def check_guild_permissions(ctx, perms, *, checks=all):
+    key = check_cache.key(ctx, ("guild_permissions", checks, tuple(sorted(perms.items()))))
+    result = check_cache.get(key)
+    if result is None:
+        result = check_cache.set(key, await _check_guild_permissions(ctx, perms, checks))
+    return result
+
+
 def has_guild_permissions(*, checks=all, **perms):
     async def pred(ctx):
         return await check_guild_permissions(ctx, perms, checks=checks)
@@ -82,13 +167,48 @@ def can_react(ctx: Context, channel: Optional[TextChannel] = None) -> bool:
 
 
 # noinspection PyProtectedMember
-async def staff_perms(ctx: Context, allowed_list: List[int]) -> bool:
-    if not set(allowed_list).isdisjoint(ctx.author._roles):
+def member_tier(member: Union[Member, User]) -> int:
+    """
+    Highest staff tier of `member` (see core.constants.ROLE_TIERS), 0 for none.
+    Resolved once per member and reused until their roles change
+    """
+    roles = getattr(member, "_roles", None)
+    if roles is None:
+        return 0
+    key = roles.tobytes()
+    cached = _member_tiers.get(member.id)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    tier = max((ROLE_TIER.get(role, 0) for role in roles), default=0)
+    _member_tiers[member.id] = (key, tier)
+    return tier
+
+
+def invalidate_member(member_id: Optional[int] = None):
+    """Forgets the tier and check outcomes of a member, or of everyone without `member_id`"""
+    if member_id is None:
+        _member_tiers.clear()
+    else:
+        _member_tiers.pop(member_id, None)
+    check_cache.invalidate(member_id)
+
+
+async def staff_perms(ctx: Context, min_role: int) -> bool:
+    """
+    Passes when the author has `min_role` or a higher staff role
+    Params:
+     - min_role (int) : The lowest role of core.constants.ROLE_TIERS allowed
+    """
+    key = check_cache.key(ctx, ("staff", min_role))
+    allowed = check_cache.get(key)
+    if allowed is None:
+        allowed = check_cache.set(key, member_tier(ctx.author) >= ROLE_TIER[min_role])
+    if allowed:
         return True
     if is_invoked_with_command(ctx):
         await Raise(
             ctx,
-            f"Only <@&{allowed_list[0]}> and higher staffs can use this command",
+            f"Only <@&{min_role}> and higher staffs can use this command",
             delete_after=None if ctx.channel.id in COMMAND_CHANNELS else 5
         ).info()
         try:
@@ -99,23 +219,23 @@ async def staff_perms(ctx: Context, allowed_list: List[int]) -> bool:
 
 
 async def is_staff(ctx: Context) -> bool:
-    return await staff_perms(ctx, [ROLE.STAFF, ROLE.MOD, ROLE.SR_MOD, ROLE.ADMIN, ROLE.MANAGER, ROLE.OWNER])
+    return await staff_perms(ctx, ROLE.STAFF)
 
 
 async def is_mod(ctx: Context) -> bool:
-    return await staff_perms(ctx, [ROLE.MOD, ROLE.SR_MOD, ROLE.ADMIN, ROLE.MANAGER, ROLE.OWNER])
+    return await staff_perms(ctx, ROLE.MOD)
 
 
 async def is_sr_mod(ctx: Context) -> bool:
-    return await staff_perms(ctx, [ROLE.SR_MOD, ROLE.ADMIN, ROLE.MANAGER, ROLE.OWNER])
+    return await staff_perms(ctx, ROLE.SR_MOD)
 
 
 async def is_admin(ctx: Context) -> bool:
-    return await staff_perms(ctx, [ROLE.ADMIN, ROLE.MANAGER, ROLE.OWNER])
+    return await staff_perms(ctx, ROLE.ADMIN)
 
 
 async def is_manager(ctx: Context) -> bool:
-    return await staff_perms(ctx, [ROLE.MANAGER, ROLE.OWNER])
+    return await staff_perms(ctx, ROLE.MANAGER)
 
 
 async def in_command_channel(ctx: Context):
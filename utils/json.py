@@ -1,9 +1,14 @@
+import asyncio
 import json
+import os
+import stat
+import tempfile
+from copy import deepcopy
 from pathlib import Path
 
-__all__ = ["read_json", "write_json", "json_unset", "json_upsert"]
+__all__ = ["read_json", "write_json", "json_unset", "json_upsert", "JsonStore", "get_store"]
 
-from typing import List, Dict, Union, Any
+from typing import List, Dict, Union, Any, Optional, Iterable
 
 
 def get_path():
@@ -17,6 +22,161 @@ def get_path():
     return cwd
 
 
+def _load(path: Path) -> Dict[str, Any]:
+    """
+    Parses a json file, a missing or empty file is an empty dict
+    """
+    try:
+        with open(path, 'r') as file:
+            text = file.read()
+    except FileNotFoundError:
+        return {}
+    if not text.strip():
+        return {}
+    return json.loads(text)
+
+
+def _atomic_write(path: Path, text: str):
+    """
+    Writes to a temp file next to `path` and renames it over `path`,
+    so a crash mid-write never leaves a half written file behind
+    """
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        # mkstemp files are 0600, keep the mode the file had so other readers still can
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(temp, mode)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+class JsonStore:
+    """
+    A json file of the assets folder, kept parsed in memory.
+    Changes are written after `delay` seconds, so a burst of upserts costs one write,
+    which runs in a thread and replaces the file atomically
+    Params:
+     - filename (string) : The name of the file, without extension
+     - delay (float) : Seconds to wait for more changes before writing
+    `version` goes up on every change, so values derived from the document can tell they are stale
+    """
+
+    def __init__(self, filename: str, delay: float = 0.5):
+        self.filename = filename
+        self.path = Path(get_path()) / "assets" / f"{filename}.json"
+        self.delay = delay
+        self._data: Optional[Dict[str, Any]] = None
+        self._write_task: Optional[asyncio.Task] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self.version = 0
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """The parsed document, read from disk on first access"""
+        if self._data is None:
+            self._data = _load(self.path)
+        return self._data
+
+    async def load(self) -> Dict[str, Any]:
+        """Reads the file in a thread, if it wasn't read already"""
+        if self._data is None:
+            data = await asyncio.to_thread(_load, self.path)
+            if self._data is None:
+                self._data = data
+        return self._data
+
+    async def reload(self) -> Dict[str, Any]:
+        """Discards the in memory document and reads the file again"""
+        await self.flush()
+        self._data = None
+        self.version += 1
+        return await self.load()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.data
+
+    def upsert(self, data: Dict[str, Any]):
+        self.data.update(data)
+        self.version += 1
+        self._schedule()
+
+    def unset(self, keys: Iterable[str]):
+        for key in keys:
+            self.data.pop(key, None)
+        self.version += 1
+        self._schedule()
+
+    def replace(self, data: Dict[str, Any]):
+        self._data = dict(data)
+        self.version += 1
+        self._schedule()
+
+    def write(self):
+        """Writes the document right away, blocking"""
+        if self._write_task is not None:
+            self._write_task.cancel()
+            self._write_task = None
+        _atomic_write(self.path, json.dumps(self.data, indent=4))
+
+    def _schedule(self):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to write from, nothing to debounce against either
+            return self.write()
+        if self._write_task is None:
+            self._write_task = asyncio.create_task(self._write_later())
+
+    async def _write_later(self):
+        await asyncio.sleep(self.delay)
+        self._write_task = None
+        await self._write()
+
+    async def _write(self):
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        # Serialised on the loop, so the thread writes a consistent snapshot
+        text = json.dumps(self.data, indent=4)
+        async with self._write_lock:
+            await asyncio.to_thread(_atomic_write, self.path, text)
+
+    async def flush(self):
+        """Writes pending changes now instead of waiting for the debounce, and waits for a write in progress"""
+        if self._write_task is not None:
+            self._write_task.cancel()
+            self._write_task = None
+            return await self._write()
+        if self._write_lock is not None and self._write_lock.locked():
+            # _write_later already handed its snapshot to the thread, wait until it is on disk
+            async with self._write_lock:
+                pass
+
+
+_stores: Dict[str, JsonStore] = {}
+
+
+def get_store(filename) -> JsonStore:
+    """
+    Returns the shared JsonStore of `filename`
+    """
+    store = _stores.get(filename)
+    if store is None:
+        store = _stores[filename] = JsonStore(filename)
+    return store
+
+
 def read_json(filename):
     """
     A function to read a json file and return the data.
@@ -25,10 +185,7 @@ def read_json(filename):
     Returns:
      - data (dict) : A dict of the data in the file
     """
-    cwd = get_path()
-    with open(cwd + '/assets/' + filename + '.json', 'r') as file:
-        data = json.load(file)
-    return data
+    return deepcopy(get_store(filename).data)
 
 
 def write_json(data, filename):
@@ -38,25 +195,22 @@ def write_json(data, filename):
      - data (dict) : The data to write to the file
      - filename (string) : The name of the file to write to
     """
-    cwd = get_path()
-    with open(cwd + '/assets/' + filename + '.json', 'w') as file:
-        json.dump(data, file, indent=4)
+    store = get_store(filename)
+    store._data = deepcopy(data)
+    store.version += 1
+    store.write()
 
 
 def json_unset(data: List[str], filename):
-    # Check if its actually a Dictionary
-    json_data = read_json(filename)
-    for value in data:
-        if json_data and value in json_data:
-            json_data.pop(value)
-    write_json(json_data, filename)
+    store = get_store(filename)
+    for key in data:
+        store.data.pop(key, None)
+    store.version += 1
+    store.write()
 
 
 def json_upsert(data: Dict[str, Union[str, int, List[Any], Dict[Any, Any]]], filename):
-    config = read_json(filename)
-    if config:
-        for key, value in data.items():
-            config[key] = value
-    else:
-        config = data
-    write_json(config, filename)
+    store = get_store(filename)
+    store.data.update(data)
+    store.version += 1
+    store.write()
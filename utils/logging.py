@@ -1,8 +1,18 @@
+import asyncio
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
-from typing import TYPE_CHECKING, Optional
+import time
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING, Optional, List, Tuple
+
+import aiohttp
 from nextcord.utils import find
-from nextcord import Embed, ClientException, Color
+from nextcord import Embed, Color
 from colorama import Fore, Style
 
 if TYPE_CHECKING:
@@ -11,9 +21,29 @@ if TYPE_CHECKING:
 
 
 class Log:
-    def __init__(self, bot: "BaseMainBot"):
+    """
+    Ships messages to the log channel webhook from a background task.
+    `send` only queues the message, the shipper then waits `linger` seconds so a burst
+    piles up, folds repeated messages into one embed with a count, posts up to 10
+    embeds per webhook message and waits out Discord's rate limit headers.
+    When `max_queue` messages are waiting new ones are dropped and counted.
+    """
+    MAX_EMBEDS = 10
+    MAX_CHARACTERS = 6000  # Discord's limit for all embeds of one message together
+
+    def __init__(self, bot: "BaseMainBot", *, max_queue: int = 1000, linger: float = 2.0):
         self._bot = bot
         self.__webhook: Optional["Webhook"] = None
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        # Taken off the queue but not posted yet, so close can still post it
+        self._batch: "OrderedDict[str, int]" = OrderedDict()
+        self.linger = linger
+        self.sent = 0
+        self.dropped = 0
+        self._reported_drops = 0
+        self._remaining: Optional[int] = None
+        self._reset_at = 0.0
 
     async def sync(self, _id: int) -> "Webhook":
         channel = self._bot.guild.get_channel(_id)
@@ -23,49 +53,115 @@ class Log:
                 name=self._bot.user.display_name,
                 avatar=self._bot.user.display_avatar,
             )
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._ship())
         return self.__webhook
 
-    async def send(self, message: str):
-        if self.__webhook is None:
-            raise ClientException("Try to run Log.sync(log_channel_id) first")
-        await self.__webhook.send(embed=Embed(
-            color=Color.brand_red(),
-            description=message[:2000]
-        ))
+    def send(self, message: str):
+        """Queues `message` for the log channel and returns right away"""
+        try:
+            self._queue.put_nowait(message[:2000])
+        except asyncio.QueueFull:
+            self.dropped += 1
 
+    def _drain(self, batch: Optional["OrderedDict[str, int]"] = None) -> "OrderedDict[str, int]":
+        batch = OrderedDict() if batch is None else batch
+        while not self._queue.empty():
+            message = self._queue.get_nowait()
+            batch[message] = batch.get(message, 0) + 1
+        return batch
 
-class BotLogger(logging.Logger,):
-    @staticmethod
-    def _debug_(*msgs):
-        return f'{Fore.CYAN}{" ".join(msgs)}{Style.RESET_ALL}'
+    def _embeds(self, batch: "OrderedDict[str, int]") -> List[Tuple[Optional[str], Embed]]:
+        """(message, embed) of every batched message, the queue full notice has no message"""
+        embeds = []
+        for message, count in batch.items():
+            embed = Embed(color=Color.brand_red(), description=message)
+            if count > 1:
+                embed.set_footer(text=f"Repeated {count} times")
+            embeds.append((message, embed))
+        if self.dropped > self._reported_drops:
+            embeds.append((None, Embed(
+                color=Color.dark_red(),
+                description=f"Log queue was full, dropped {self.dropped - self._reported_drops} messages"
+            )))
+            self._reported_drops = self.dropped
+        return embeds
 
-    @staticmethod
-    def _info_(*msgs):
-        return f'{Fore.LIGHTMAGENTA_EX}{" ".join(msgs)}{Style.RESET_ALL}'
+    async def _ship(self):
+        while True:
+            message = await self._queue.get()
+            self._batch[message] = 1
+            await asyncio.sleep(self.linger)
+            self._drain(self._batch)
+            # Any failure only loses this batch, the shipper has to outlive it
+            try:
+                await self._post_all(self._batch)
+            except Exception as error:
+                get_logger(__name__).error("Posting %s log messages failed: %r", len(self._batch), error)
+            self._batch = OrderedDict()
 
-    @staticmethod
-    def _error_(*msgs):
-        return f'{Fore.RED}{" ".join(msgs)}{Style.RESET_ALL}'
+    async def _post_all(self, batch: "OrderedDict[str, int]"):
+        chunk, size = [], 0
+        for message, embed in self._embeds(batch):
+            length = len(embed)
+            if chunk and (len(chunk) == self.MAX_EMBEDS or size + length > self.MAX_CHARACTERS):
+                await self._post_chunk(batch, chunk)
+                chunk, size = [], 0
+            chunk.append((message, embed))
+            size += length
+        if chunk:
+            await self._post_chunk(batch, chunk)
 
-    def debug(self, msg, *args, **kwargs):
-        if self.isEnabledFor(logging.DEBUG):
-            self._log(logging.DEBUG, self._debug_(msg), args, **kwargs)
+    async def _post_chunk(self, batch: "OrderedDict[str, int]", chunk: List[Tuple[Optional[str], Embed]]):
+        await self._post([embed for _, embed in chunk])
+        # Done with, so close doesn't post it again if the shipper is cancelled mid batch
+        for message, _ in chunk:
+            batch.pop(message, None)
 
-    def info(self, msg, *args, **kwargs):
-        if self.isEnabledFor(logging.INFO):
-            self._log(logging.INFO, self._info_(msg), args, **kwargs)
+    async def _post(self, embeds: List[Embed]):
+        payload = {"embeds": [embed.to_dict() for embed in embeds]}
+        while True:
+            if self._remaining == 0 and self._reset_at > time.monotonic():
+                await asyncio.sleep(self._reset_at - time.monotonic())
+            try:
+                async with self._bot.session.post(self.__webhook.url, json=payload) as response:
+                    remaining = response.headers.get("X-RateLimit-Remaining")
+                    reset_after = response.headers.get("X-RateLimit-Reset-After")
+                    if remaining is not None:
+                        self._remaining = int(remaining)
+                    if reset_after is not None:
+                        self._reset_at = time.monotonic() + float(reset_after)
+                    if response.status == 429:
+                        data = await response.json()
+                        await asyncio.sleep(float(data.get("retry_after", reset_after or 1)))
+                        continue
+                    if response.status >= 400:
+                        get_logger(__name__).error(
+                            "Log webhook responded %s: %s", response.status, await response.text())
+                        return
+            except aiohttp.ClientError as error:
+                get_logger(__name__).error("Log webhook failed: %r", error)
+                return
+            self.sent += len(embeds)
+            return
 
-    def warning(self, msg, *args, **kwargs):
-        if self.isEnabledFor(logging.WARNING):
-            self._log(logging.WARNING, self._error_(msg), args, **kwargs)
+    async def close(self):
+        """Posts whatever is still queued and stops the shipper"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        batch, self._batch = self._drain(self._batch), OrderedDict()
+        if batch and self.__webhook is not None:
+            await self._post_all(batch)
 
-    def error(self, msg, *args, **kwargs):
-        if self.isEnabledFor(logging.ERROR):
-            self._log(logging.ERROR, self._error_(msg), args, **kwargs)
 
-    def critical(self, msg, *args, **kwargs):
-        if self.isEnabledFor(logging.CRITICAL):
-            self._log(logging.CRITICAL, self._error_(msg), args, **kwargs)
+class BotLogger(logging.Logger,):
+    """
+    Logger with a `line` separator helper. Colors are added by ColorFormatter when
+    the record is written, so use lazy `%` arguments (`logger.debug("%s", value)`)
+    and a filtered out call costs no formatting at all
+    """
 
     def line(self, level="info"):
         if level == "info":
@@ -77,26 +173,105 @@ class BotLogger(logging.Logger,):
         if self.isEnabledFor(level):
             self._log(
                 level=logging.INFO,
-                msg=Fore.BLACK + Style.BRIGHT + "-------------------------" + Style.RESET_ALL,
-                args=()
+                msg="-------------------------",
+                args=(),
+                extra={"color": Fore.BLACK + Style.BRIGHT},
+                stacklevel=2
             )
 
 
+class ColorFormatter(logging.Formatter):
+    """Colors the message by level, or by a `color` passed through `extra`"""
+    COLORS = {
+        logging.DEBUG: Fore.CYAN,
+        logging.INFO: Fore.LIGHTMAGENTA_EX,
+        logging.WARNING: Fore.RED,
+        logging.ERROR: Fore.RED,
+        logging.CRITICAL: Fore.RED,
+    }
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        color = getattr(record, "color", None) or self.COLORS.get(record.levelno)
+        if not color:
+            return super().formatMessage(record)
+        message = record.message
+        record.message = f"{color}{message}{Style.RESET_ALL}"
+        try:
+            return super().formatMessage(record)
+        finally:
+            record.message = message
+
+
+class JsonFormatter(logging.Formatter):
+    """One json object per line, for log ingestion"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record, self.datefmt),
+            "name": record.name,
+            "line": record.lineno,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data)
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Only merges the message arguments on the calling thread,
+    formatting and writing is left to the listener thread
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Records are only shared with our own handlers, no need for the copy QueueHandler makes
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
 logging.setLoggerClass(BotLogger)
 log_level = logging.INFO
 loggers = set()
 
 ch = logging.StreamHandler(stream=sys.stdout)
 ch.setLevel(log_level)
-formatter = logging.Formatter(
-    "%(asctime)s %(name)s[%(lineno)d] - %(levelname)s: %(message)s", datefmt="%m/%d/%y %H:%M:%S"
-)
+# LOG_COLOR=1/0 forces colors on/off, by default they are only used on a terminal
+use_color = os.getenv("LOG_COLOR", "1" if sys.stdout.isatty() else "0") == "1"
+if os.getenv("LOG_FORMAT", "").lower() == "json":
+    formatter = JsonFormatter(datefmt="%Y-%m-%dT%H:%M:%S")
+else:
+    formatter = (ColorFormatter if use_color else logging.Formatter)(
+        "%(asctime)s %(name)s[%(lineno)d] - %(levelname)s: %(message)s", datefmt="%m/%d/%y %H:%M:%S"
+    )
 ch.setFormatter(formatter)
 
+# Loggers only put records on this queue, a listener thread formats and writes them,
+# so a slow stdout never stalls the event loop
+log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+qh = LazyQueueHandler(log_queue)
+listener = QueueListener(log_queue, ch, respect_handler_level=True)
+listener.start()
+
+
+def shutdown():
+    """
+    Writes out every queued record and stops the listener thread. Runs at exit,
+    call it before os.execv too, which replaces the process without running atexit
+    """
+    # StreamHandler flushes after every record, so stopping the listener is enough
+    if listener._thread is not None:
+        listener.stop()
+
+
+atexit.register(shutdown)
+
 
 def get_logger(name=None) -> BotLogger:
     logger = logging.getLogger(name)
     logger.setLevel(log_level)
-    logger.addHandler(ch)
+    if qh not in logger.handlers:
+        logger.addHandler(qh)
     loggers.add(logger)
     return logger  # type: ignore
@@ -1,9 +1,16 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+from dataclasses import dataclass
+
 from nextcord.enums import Enum
 
 from . import logging
-from typing import List, Optional, Dict, Any, Union, Iterator
+from typing import List, Optional, Dict, Any, Union, Iterator, Hashable, AsyncIterator, Sequence, Tuple, Awaitable
 
-from pymongo import UpdateOne, ReturnDocument, DeleteOne
+from pymongo import UpdateOne, ReturnDocument, DeleteOne, IndexModel, monitoring
 from pymongo.errors import BulkWriteError
 from pymongo.results import DeleteResult, BulkWriteResult
 
@@ -28,18 +35,497 @@ class Opcode(Enum):
         return self.value
 
 
-class Document:
-    __slots__ = ("db", "logger")
+_MISSING = object()
+# Matches documents which have nothing but an `_id`
+ID_ONLY: Dict[str, Any] = {"$expr": {"$eq": [{"$size": {"$objectToArray": "$$ROOT"}}, 1]}}
+
+
+@dataclass
+class BulkStats:
+    """Outcome of a server side bulk operation"""
+    matched: int = 0
+    modified: int = 0
+    elapsed: float = 0.0
+
+
+class DocumentCache:
+    """
+    A bounded in-process LRU cache of documents keyed by `_id`.
+    Entries older than `ttl` seconds are treated as missing.
+    `None` is cached as well, so lookups of absent documents are cheap too.
+    """
+    __slots__ = ("max_size", "ttl", "_data", "hits", "misses", "evictions")
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, _id: Hashable) -> Any:
+        """
+        Returns a copy of the cached document or `_MISSING`
+        """
+        try:
+            expires, doc = self._data[_id]
+        except KeyError:
+            self.misses += 1
+            return _MISSING
+        if expires is not None and expires < time.monotonic():
+            del self._data[_id]
+            self.evictions += 1
+            self.misses += 1
+            return _MISSING
+        self._data.move_to_end(_id)
+        self.hits += 1
+        return deepcopy(doc)
+
+    def set(self, _id: Hashable, doc: Optional[Dict[str, Any]]) -> None:
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        self._data[_id] = (expires, deepcopy(doc))
+        self._data.move_to_end(_id)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, _id: Hashable) -> None:
+        self._data.pop(_id, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+@dataclass
+class QueryPlan:
+    """
+    How a find_many style query is sent to mongo.
+    `find` plans use filter/projection/options, `aggregate` plans use pipeline
+    """
+    kind: str
+    filter: Optional[Dict[str, Any]] = None
+    projection: Optional[Dict[str, Any]] = None
+    options: Optional[Dict[str, Any]] = None
+    pipeline: Optional[List[Dict[str, Any]]] = None
+
+
+def plan_query(
+        _dict: Dict[str, Any] = None, *,
+        limit: int = 0,
+        skip: int = 0,
+        sort: Dict[str, int] = None,
+        group: Dict[str, Any] = None,
+        projection: Dict[str, Any] = None
+) -> QueryPlan:
+    """
+    Orders the stages of a query so mongo can use its indexes
+    `$match` always comes first and `$project` comes last. Without a `$group` there is
+    no need for a pipeline, so a plain find is used, where sort and limit let the server
+    only keep the top documents. With one, `$sort` and `$skip` apply to the stored documents
+    before the `$group` and `$limit` to the groups, so accumulators see the same order as before.
+    Params:
+     -  _dict (Dictionary) : Filter on the stored documents, applied before grouping
+     -  projection (Dictionary) : Applied to the final documents, after grouping
+    """
+    if group is None:
+        options: Dict[str, Any] = {}
+        if sort:
+            options["sort"] = list(sort.items())
+        if skip > 0:
+            options["skip"] = skip
+        if limit > 0:
+            options["limit"] = limit
+        return QueryPlan("find", filter=_dict or {}, projection=projection, options=options)
+
+    pipeline: List[Dict[str, Any]] = []
+    if _dict:
+        pipeline.append({"$match": _dict})
+    # Sorting and skipping the stored documents, as before, decides what $first/$last pick
+    if sort:
+        pipeline.append({"$sort": sort})
+    if skip > 0:
+        pipeline.append({"$skip": skip})
+    pipeline.append({"$group": group})
+    if limit > 0:
+        pipeline.append({"$limit": limit})
+    if projection is not None:
+        pipeline.append({"$project": projection})
+    return QueryPlan("aggregate", pipeline=pipeline)
+
+
+def _plan_stages(explained: Any, winning: bool = False) -> List[str]:
+    """
+    Collects the stage names of every winning plan found in an explain output
+    """
+    stages = []
+    if isinstance(explained, dict):
+        for key, value in explained.items():
+            if key == "stage" and winning and isinstance(value, str):
+                stages.append(value)
+            elif key != "rejectedPlans":
+                stages.extend(_plan_stages(value, winning or key in ("winningPlan", "queryPlan")))
+    elif isinstance(explained, list):
+        for value in explained:
+            stages.extend(_plan_stages(value, winning))
+    return stages
+
+
+# Upper bounds (ms) of the latency histogram buckets, anything slower lands in the last bucket
+LATENCY_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+
+class LatencyHistogram:
+    """Fixed bucket latency histogram of one collection/operation pair"""
+    __slots__ = ("buckets", "count", "failures", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.failures = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float, failed: bool = False) -> None:
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if ms <= bound:
+                self.buckets[index] += 1
+                break
+        self.count += 1
+        self.failures += failed
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the `q` (0-1) percentile, the max for the last bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "avg_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 3),
+            "buckets": {str(bound): count for bound, count in zip(LATENCY_BUCKETS, self.buckets)}
+        }
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    pymongo command listener recording per collection, per operation latency and in flight counts.
+    Motor runs pymongo in worker threads, so every update happens under a lock
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: Dict[int, Tuple[str, str]] = {}
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.in_flight: Dict[Tuple[str, str], int] = {}
+
+    @staticmethod
+    def _key(event: monitoring.CommandStartedEvent) -> Tuple[str, str]:
+        target = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        collection = f"{event.database_name}.{target}" if isinstance(target, str) else event.database_name
+        return collection, event.command_name
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        key = self._key(event)
+        with self._lock:
+            self._started[event.request_id] = key
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+
+    def _finished(self, event, failed: bool) -> None:
+        with self._lock:
+            key = self._started.pop(event.request_id, None)
+            if key is None:
+                return
+            self.in_flight[key] -= 1
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.add(event.duration_micros / 1000, failed)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finished(event, False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finished(event, True)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Structured dump of the metrics, keyed by collection then operation
+        """
+        with self._lock:
+            keys = set(self.histograms) | {key for key, count in self.in_flight.items() if count}
+            data: Dict[str, Dict[str, Any]] = {}
+            for collection, operation in sorted(keys):
+                histogram = self.histograms.get((collection, operation), LatencyHistogram())
+                data.setdefault(collection, {})[operation] = {
+                    **histogram.to_dict(),
+                    "in_flight": self.in_flight.get((collection, operation), 0)
+                }
+            return data
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+
 
-    def __init__(self, connection, document_name):
+class Document:
+    __slots__ = (
+        "db", "logger", "cache", "indexes",
+        "write_behind", "batch_size", "flush_interval",
+        "_pending", "_retry", "_flush_task", "_flush_lock", "_reads", "_epoch"
+    )
+
+    def __init__(
+            self, connection, document_name, *,
+            cache_size: int = 0,
+            cache_ttl: Optional[float] = None,
+            indexes: Sequence[IndexModel] = (),
+            write_behind: bool = False,
+            batch_size: int = 500,
+            flush_interval: float = 5.0):
         """
         Our init function, sets up the connection to the specified document
         Params:
-         - connection (Mongo Connection) : Our database connection
+         - connection (Mongo Connection) : Our database connection, a Motor database or any
+           backend with the same collection API like utils.mongo_memory.MemoryDatabase
          - documentName (str) : The document this instance should be
+         - cache_size (int) : Max documents kept in memory by `_id`, 0 disables the cache
+         - cache_ttl (float) : Seconds a cached document stays valid, None for no expiry
+         - indexes (Sequence[IndexModel]) : Indexes this collection should have, see self.ensure_indexes
+         - write_behind (bool) : Buffer `increment`/`upsert` calls and write them in bulk
+         - batch_size (int) : Pending `_id`s that trigger a flush in write behind mode
+         - flush_interval (float) : Max seconds a buffered write waits before being flushed
         """
         self.db = connection[document_name]
         self.logger = logging.get_logger(__name__)
+        self.cache: Optional[DocumentCache] = DocumentCache(cache_size, cache_ttl) if cache_size > 0 else None
+        self.indexes = tuple(indexes)
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[Any, Dict[str, Dict[str, Any]]] = {}
+        # Failed updates that can't be merged with the newer ones, written before them
+        self._retry: List[Tuple[Any, Dict[str, Dict[str, Any]]]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        # [reads in flight, invalidations seen] by `_id`, only while a read of it is in flight
+        self._reads: Dict[Any, List[int]] = {}
+        self._epoch = 0  # Invalidations of the whole cache
+
+    def _invalidate(self, _id: Any = _MISSING) -> None:
+        """
+        Drops `_id` from the cache, or every cached document when no `_id` is given
+        """
+        if self.cache is None:
+            return
+        if _id is _MISSING:
+            self._epoch += 1
+            self.cache.clear()
+        else:
+            reads = self._reads.get(_id)
+            if reads is not None:
+                reads[1] += 1
+            self.cache.invalidate(_id)
+
+    async def _remember(self, _id: Any, read: Awaitable[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Awaits `read` and stores a fresh copy of the document it returns in the cache.
+        Not stored if `_id` was invalidated meanwhile, the document may predate that write
+        """
+        if self.cache is None:
+            return await read
+        reads = self._reads.setdefault(_id, [0, 0])
+        reads[0] += 1
+        seen = (self._epoch, reads[1])
+        try:
+            doc = await read
+        finally:
+            reads[0] -= 1
+            if not reads[0]:
+                del self._reads[_id]
+        if seen == (self._epoch, reads[1]):
+            self.cache.set(_id, doc)
+        return doc
+
+    # <-- Indexes -->
+    async def ensure_indexes(self, drop_extra: bool = False) -> Dict[str, Any]:
+        """
+        Creates the declared indexes which don't exist yet
+        Params:
+         - drop_extra (bool) : Also drop indexes that exist but aren't declared
+        Returns:
+         - A report of the missing (now created), extra, dropped and changed index names,
+           changed ones share a name with a declared index but not its keys/options
+        """
+        existing = await self.db.index_information()
+        declared = {index.document["name"]: index.document for index in self.indexes}
+        missing = [name for name in declared if name not in existing]
+        extra = [name for name in existing if name != "_id_" and name not in declared]
+        changed = [
+            name for name, document in declared.items() if name in existing and (
+                list(document["key"].items()) != [tuple(key) for key in existing[name]["key"]] or any(
+                    document.get(option) != existing[name].get(option)
+                    for option in ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+                )
+            )
+        ]
+        if missing:
+            await self.db.create_indexes([index for index in self.indexes if index.document["name"] in missing])
+        if drop_extra:
+            for name in extra:
+                await self.db.drop_index(name)
+        return {
+            "collection": self.db.name,
+            "missing": missing,
+            "extra": extra,
+            "dropped": extra if drop_extra else [],
+            "changed": changed
+        }
+
+    # <-- Write behind -->
+    @staticmethod
+    def _conflicts(pending: Dict[str, Dict[str, Any]], opcode: str, _dict: Dict[str, Any]) -> bool:
+        """
+        Checks if merging `_dict` into `pending` would update overlapping paths,
+        which mongo refuses within a single update
+        """
+        for pending_opcode, fields in pending.items():
+            for field in fields:
+                for key in _dict:
+                    if field == key:
+                        if pending_opcode != opcode:
+                            return True
+                    elif field.startswith(key + ".") or key.startswith(field + "."):
+                        return True
+        return False
+
+    async def _buffer(self, _id: Any, opcode: str, _dict: Dict[str, Any]) -> None:
+        """
+        Merges an update into the pending writes of `_id`
+        """
+        pending = self._pending.get(_id)
+        if pending is not None and self._conflicts(pending, opcode, _dict):
+            await self.flush()
+            pending = None
+        if pending is None:
+            pending = self._pending.setdefault(_id, {})
+        fields = pending.setdefault(opcode, {})
+        for key, value in _dict.items():
+            if opcode == "$inc":
+                fields[key] = fields.get(key, 0) + value
+            else:
+                fields[key] = value
+        self._invalidate(_id)
+
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    async def _sync(self, _id: Any = _MISSING) -> None:
+        """
+        Flushes buffered writes before an operation that must observe them
+        Params:
+         - _id () : Only flush if this `_id` has pending writes, every pending write if not given
+        """
+        if not self.write_behind:
+            return
+        if self._flush_lock.locked() or self._retry \
+                or (self._pending if _id is _MISSING else _id in self._pending):
+            await self.flush()
+
+    async def flush(self) -> Optional[BulkWriteResult]:
+        """
+        Writes every buffered update with a single bulk_write
+        """
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+            self._flush_task = None
+        async with self._flush_lock:
+            if not self._pending and not self._retry:
+                return None
+            pending, self._pending = self._pending, {}
+            retry, self._retry = self._retry, []
+            requests = [
+                UpdateOne({"_id": _id}, update, upsert=True)
+                for _id, update in (*retry, *pending.items())
+            ]
+            try:
+                # Retried updates must land before the newer ones of the same _id
+                return await self.db.bulk_write(requests, ordered=bool(retry))
+            except BulkWriteError as bwe:
+                self.logger.critical(bwe.details)
+            except Exception as error:
+                # Not written at all, keep the updates for the next flush instead of losing them
+                self.logger.error("Flushing %s writes failed, retrying later: %r", len(requests), error)
+                self._retry[:0] = retry
+                self._requeue(pending)
+                if self._flush_task is None:
+                    self._flush_task = asyncio.create_task(self._flush_later())
+            finally:
+                for _id, _ in retry:
+                    self._invalidate(_id)
+                for _id in pending:
+                    self._invalidate(_id)
+
+    def _requeue(self, failed: Dict[Any, Dict[str, Dict[str, Any]]]) -> None:
+        """
+        Puts the updates of a failed flush back in front of the ones buffered since
+        """
+        for _id, update in failed.items():
+            newer = self._pending.get(_id)
+            if newer is None:
+                self._pending[_id] = update
+                continue
+            # Paths the newer update sets or unsets outright, what the failed one did to them doesn't matter
+            replaced = [key for opcode in ("$set", "$unset") for key in newer.get(opcode, ())]
+            kept: Dict[str, Dict[str, Any]] = {}
+            for opcode, fields in update.items():
+                for key, value in fields.items():
+                    if not any(key == path or key.startswith(path + ".") for path in replaced):
+                        kept.setdefault(opcode, {})[key] = value
+            update = kept
+            if not update:
+                continue
+            if any(self._conflicts(update, opcode, f) for opcode, f in newer.items()):
+                # e.g. a failed $set and a newer $inc of the same field, both have to be applied in order
+                self._retry.append((_id, update))
+                continue
+            for opcode, fields in newer.items():
+                merged = update.setdefault(opcode, {})
+                for key, value in fields.items():
+                    merged[key] = merged.get(key, 0) + value if opcode == "$inc" else value
+            self._pending[_id] = update
 
     # <-- Pointer Methods -->
     async def find(
@@ -77,7 +563,7 @@ class Document:
             projection: Dict[str, Any] = None,
     ) -> Optional[List[Dict[str, Any]]]:
         """
-        Returns the data found under quarry dict
+        Returns the data found under quarry dict, see plan_query for how the query is built
         Params:
          -  _dict (Dictionary) : The Dictionary to quarry
          -  limit () : To limit the result in MongoDB, we use the limit() method.
@@ -85,27 +571,8 @@ class Document:
          - None if nothing is found
          - If somethings found, return that
         """
-        if (limit <= 0) and sort is None and _dict is not None:
-            cursor = self.db.find(_dict, projection)
-        else:
-            payload = []
-            if sort is not None:
-                payload.append({"$sort": sort})
-            if skip > 0:
-                payload.append({"$skip": skip})
-            if projection is not None:
-                payload.append({"$project": projection})
-            if group is not None:
-                payload.append({"$group": group})
-            if _dict is not None:
-                payload.append({"$match": _dict})
-            if limit > 0:
-                payload.append({"$limit": limit})
-            cursor = self.db.aggregate(payload)
-        data = []
-        async for document in cursor:
-            data.append(document)
-        return data
+        return [document async for document in self.iter_many(
+            _dict, limit=limit, skip=skip, sort=sort, group=group, projection=projection)]
 
     async def aggregate(self, payload: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
         """
@@ -113,11 +580,117 @@ class Document:
         Params:
          -  payload (Dict[str, Any]) : The payload to aggregate data
         """
-        cursor = self.db.aggregate(payload)
-        data = []
-        async for doc in cursor:
-            data.append(doc)
-        return data
+        return [doc async for doc in self.iter_aggregate(payload)]
+
+    # <-- Streaming methods -->
+    @staticmethod
+    async def _stream(cursor, chunk_size: int) -> AsyncIterator[Any]:
+        """
+        Yields documents from `cursor` one by one, or as lists of `chunk_size` documents
+        """
+        if chunk_size <= 0:
+            async for document in cursor:
+                yield document
+            return
+        chunk = []
+        async for document in cursor:
+            chunk.append(document)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    async def iter_many(
+            self,
+            _dict: Dict[str, Any] = None, *,
+            limit: int = 0,
+            skip: int = 0,
+            sort: Dict[str, int] = None,
+            group: Dict[str, Any] = None,
+            projection: Dict[str, Any] = None,
+            batch_size: int = 0,
+            chunk_size: int = 0
+    ) -> AsyncIterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Streaming version of self.find_many, documents are yielded as the cursor fetches them
+        Params:
+         -  batch_size (int) : Documents fetched per round-trip, 0 for the server default
+         -  chunk_size (int) : Yield lists of this many documents instead of single documents
+        """
+        await self._sync()
+        plan = plan_query(_dict, limit=limit, skip=skip, sort=sort, group=group, projection=projection)
+        if plan.kind == "find":
+            options = {**plan.options, "batch_size": batch_size} if batch_size > 0 else plan.options
+            cursor = self.db.find(plan.filter, plan.projection, **options)
+        else:
+            cursor = self.db.aggregate(plan.pipeline, **({"batchSize": batch_size} if batch_size > 0 else {}))
+        async for item in self._stream(cursor, chunk_size):
+            yield item
+
+    async def explain_many(
+            self,
+            _dict: Dict[str, Any] = None, *,
+            limit: int = 0,
+            skip: int = 0,
+            sort: Dict[str, int] = None,
+            group: Dict[str, Any] = None,
+            projection: Dict[str, Any] = None,
+    ) -> Dict[str, Any]:
+        """
+        Explains how mongo runs the query self.find_many would send
+        Returns:
+         - A report with the plan, the winning plan stages and whether an index was used
+        """
+        plan = plan_query(_dict, limit=limit, skip=skip, sort=sort, group=group, projection=projection)
+        if plan.kind == "find":
+            explained = await self.db.find(plan.filter, plan.projection, **plan.options).explain()
+        else:
+            explained = await self.db.database.command(
+                "aggregate", self.db.name, pipeline=plan.pipeline, explain=True)
+        stages = _plan_stages(explained)
+        return {
+            "plan": plan.kind,
+            "query": plan.pipeline if plan.kind == "aggregate" else {
+                "filter": plan.filter, "projection": plan.projection, **plan.options},
+            "stages": stages,
+            "index_used": any(stage in ("IXSCAN", "IDHACK", "EXPRESS_IXSCAN", "COUNT_SCAN") for stage in stages),
+            "collection_scan": "COLLSCAN" in stages,
+            "explain": explained
+        }
+
+    async def iter_aggregate(
+            self, payload: List[Dict[str, Any]], *,
+            batch_size: int = 0,
+            chunk_size: int = 0
+    ) -> AsyncIterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Streaming version of self.aggregate
+        Params:
+         -  payload (List[Dict[str, Any]]) : The pipeline to aggregate data
+         -  batch_size (int) : Documents fetched per round-trip, 0 for the server default
+         -  chunk_size (int) : Yield lists of this many documents instead of single documents
+        """
+        await self._sync()
+        cursor = self.db.aggregate(payload, **({"batchSize": batch_size} if batch_size > 0 else {}))
+        async for item in self._stream(cursor, chunk_size):
+            yield item
+
+    async def iter_all(
+            self, *,
+            batch_size: int = 0,
+            chunk_size: int = 0
+    ) -> AsyncIterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Streaming version of self.get_all
+        Params:
+         -  batch_size (int) : Documents fetched per round-trip, 0 for the server default
+         -  chunk_size (int) : Yield lists of this many documents instead of single documents
+        """
+        await self._sync()
+        cursor = self.db.find({}, **({"batch_size": batch_size} if batch_size > 0 else {}))
+        async for item in self._stream(cursor, chunk_size):
+            yield item
 
     async def delete_by_id(self, _id: int) -> DeleteResult:
         """
@@ -125,7 +698,10 @@ class Document:
         Params:
          -  id () : The id to search for and delete
         """
-        return await self.db.delete_many({"_id": _id})
+        await self._sync(_id)
+        result = await self.db.delete_many({"_id": _id})
+        self._invalidate(_id)
+        return result
 
     async def insert(self, _dict: Dict):
         """
@@ -141,7 +717,9 @@ class Document:
         if not _dict["_id"]:
             raise KeyError("_id not found in supplied dict.")
 
+        await self._sync(_dict["_id"])
         await self.db.insert_one(_dict)
+        self._invalidate(_dict["_id"])
 
     async def upsert(
             self,
@@ -157,11 +735,15 @@ class Document:
             - _dict (Dictionary) : Dictionary to parse for info
 
         """
+        if self.write_behind and not _return:
+            return await self._buffer(_id, "$set", _dict)
+        await self._sync(_id)
         if _return:
-            return await self.db.find_one_and_update(
+            return await self._remember(_id, self.db.find_one_and_update(
                 {"_id": _id}, {"$set": _dict},
-                upsert=True, return_document=ReturnDocument.AFTER)
+                upsert=True, return_document=ReturnDocument.AFTER))
         await self.db.update_one({"_id": _id}, {"$set": _dict}, upsert=True)
+        self._invalidate(_id)
 
     async def unset(self, _id: int, *_fields: str, _return: Optional[bool] = False) -> Optional[Dict[str, Any]]:
         """
@@ -175,11 +757,13 @@ class Document:
         _dict = {}
         for field in _fields:
             _dict[field] = None
+        await self._sync(_id)
         if _return:
-            return await self.db.find_one_and_update(
+            return await self._remember(_id, self.db.find_one_and_update(
                 {"_id": _id}, {"$unset": _dict},
-                upsert=True, return_document=ReturnDocument.AFTER)
+                upsert=True, return_document=ReturnDocument.AFTER))
         await self.db.update_one({"_id": _id}, {"$unset": _dict})
+        self._invalidate(_id)
 
     async def update_by_id(
             self,
@@ -196,11 +780,13 @@ class Document:
             - _dict (Dictionary) : Dictionary to parse for info
 
         """
+        await self._sync(_id)
         if _return:
-            return await self.db.find_one_and_update(
-                {"_id": _id}, _dict, upsert=True, return_document=ReturnDocument.AFTER)
+            return await self._remember(_id, self.db.find_one_and_update(
+                {"_id": _id}, _dict, upsert=True, return_document=ReturnDocument.AFTER))
         else:
             await self.db.update_one({"_id": _id}, _dict, upsert=True)
+            self._invalidate(_id)
             return None
 
     async def replace(self, _id: int, _dict: Dict[str, Any]):
@@ -210,7 +796,9 @@ class Document:
         data that you don’t pass to the method replace_one().
          - _dict (Dictionary) : Dictionary to parse for info
         """
+        await self._sync(_id)
         await self.db.replace_one({"_id": _id}, _dict, upsert=True)
+        self._invalidate(_id)
 
     async def increment(
             self,
@@ -225,11 +813,15 @@ class Document:
         - _dict (Dictionary) : Dictionary to parse for info
         - _return (bool) : Return the edited value or not
         """
+        if self.write_behind and not _return:
+            return await self._buffer(_id, "$inc", _dict)
+        await self._sync(_id)
         if _return:
-            return await self.db.find_one_and_update(
+            return await self._remember(_id, self.db.find_one_and_update(
                 {"_id": _id}, {"$inc": _dict},
-                upsert=True, return_document=ReturnDocument.AFTER)
+                upsert=True, return_document=ReturnDocument.AFTER))
         await self.db.update_one({"_id": _id}, {"$inc": _dict}, upsert=True)
+        self._invalidate(_id)
 
     async def bulk_write(
             self,
@@ -238,7 +830,11 @@ class Document:
     ) -> Optional[BulkWriteResult]:
         if requests is None or not requests:
             return
-        return await self.db.bulk_write(requests, ordered=ordered)
+        await self._sync()
+        try:
+            return await self.db.bulk_write(requests, ordered=ordered)
+        finally:
+            self._invalidate()
 
     async def bulk_update(
             self, _list: Iterator[Dict[str, Any]],
@@ -250,7 +846,7 @@ class Document:
         - _list (List[Dict[str, Any]]) : List of Dictionary objects
         - field () : field to increment
         """
-        requests = []
+        requests, ids = [], []
         opcode = str(opcode)
         for _dict in _list:
             field_dict = {}
@@ -263,57 +859,92 @@ class Document:
                 for field in fields:
                     field_dict[field] = _dict[field]
             requests.append(UpdateOne({"_id": _dict["_id"]}, {opcode: field_dict}, upsert=True))
+            ids.append(_dict["_id"])
         if not requests:
             return None
+        await self._sync()
         try:
             return await self.db.bulk_write(requests, ordered=False)
         except BulkWriteError as bwe:
             self.logger.critical(bwe.details)
+        finally:
+            for _id in ids:
+                self._invalidate(_id)
 
-    async def filter_dump(self) -> None:
+    async def _chunked(
+            self, quarry: Dict[str, Any], chunk_size: int, delay: float, operation
+    ) -> BulkStats:
         """
-        Delete many Docs a given by the list
+        Runs `operation` on the `_id`s matching `quarry`, `chunk_size` ids at a time
         Params:
-        - _list (List[Dict[str, Any]]) : List of Dictionary objects
+        - quarry (Dictionary) : Documents to work on
+        - operation (Callable) : Coroutine function taking a quarry dict and returning a (matched, modified) tuple
+        - delay (float) : Seconds to sleep between chunks, to go easy on the database
+        """
+        stats = BulkStats()
+        async for chunk in self.iter_many(
+                quarry, projection={"_id": 1}, batch_size=chunk_size, chunk_size=chunk_size):
+            matched, modified = await operation({**quarry, "_id": {"$in": [_dict["_id"] for _dict in chunk]}})
+            stats.matched += matched
+            stats.modified += modified
+            if delay > 0:
+                await asyncio.sleep(delay)
+        return stats
+
+    async def filter_dump(self, chunk_size: int = 0, delay: float = 0.0) -> BulkStats:
+        """
+        Delete every Doc that has nothing but an `_id`, done by the server in one delete_many
+        Params:
+        - chunk_size (int) : If set, delete in chunks of this many documents instead
+        - delay (float) : Seconds to sleep between chunks
+        Returns:
+         - BulkStats with the deleted count as both matched and modified
         """
-        requests = []
-        for _dict in tuple(await self.get_all()):
-            if len(_dict) == 1:
-                requests.append(DeleteOne(_dict))
+        async def delete(quarry):
+            result = await self.db.delete_many(quarry)
+            return result.deleted_count, result.deleted_count
+
+        start = time.perf_counter()
+        await self._sync()
         try:
-            await self.db.bulk_write(requests, ordered=False)
-        except BulkWriteError as bwe:
-            self.logger.critical(bwe.details)
+            if chunk_size > 0:
+                stats = await self._chunked(ID_ONLY, chunk_size, delay, delete)
+            else:
+                stats = BulkStats(*await delete(ID_ONLY))
+        finally:
+            self._invalidate()
+        stats.elapsed = time.perf_counter() - start
+        return stats
 
-    async def bulk_unset(self, field: str):
+    async def bulk_unset(self, field: str, chunk_size: int = 0, delay: float = 0.0) -> BulkStats:
         """
-        Unset many Docs a given `field` is needed
+        Unset a given `field` from every Doc that has it, done by the server in one update_many
         Params:
-        - field () : field to increment
-        - _list (Optional[List[Dict[str, Any]]]) : list of dictionary
+        - field () : field to unset
+        - chunk_size (int) : If set, update in chunks of this many documents instead
+        - delay (float) : Seconds to sleep between chunks
         """
-        requests = []
-        _list: List[Dict] = await self.find_many({field: {"$exists": True}}, projection={field: 1})
-        for _dict in _list:
-            requests.append(UpdateOne(
-                {"_id": _dict["_id"]},
-                {"$unset": {field: None}}
-            ))
-        if not requests:
-            return
+        async def unset(quarry):
+            result = await self.db.update_many(quarry, {"$unset": {field: ""}})
+            return result.matched_count, result.modified_count
+
+        start = time.perf_counter()
+        await self._sync()
         try:
-            await self.db.bulk_write(requests, ordered=False)
-        except BulkWriteError as bwe:
-            self.logger.error(bwe.details)
+            if chunk_size > 0:
+                stats = await self._chunked({field: {"$exists": True}}, chunk_size, delay, unset)
+            else:
+                stats = BulkStats(*await unset({field: {"$exists": True}}))
+        finally:
+            self._invalidate()
+        stats.elapsed = time.perf_counter() - start
+        return stats
 
     async def get_all(self) -> List[Dict[str, Any]]:
         """
         Returns a list of all data in the document
         """
-        data = []
-        async for document in self.db.find({}):
-            data.append(document)
-        return data
+        return [document async for document in self.iter_all()]
 
     # <-- Private methods -->
     async def find_by_id(
@@ -327,14 +958,21 @@ class Document:
          - None if nothing is found
          - If somethings found, return that
         """
+        await self._sync(_id)
         if projection is not None:
             return await self.db.find_one({"_id": _id}, projection=projection)
+        if self.cache is not None:
+            doc = self.cache.get(_id)
+            if doc is not _MISSING:
+                return doc
+            return await self._remember(_id, self.db.find_one({"_id": _id}))
         return await self.db.find_one({"_id": _id})
 
     async def find_one(
             self, query: Dict[str, Any],
             projection: Dict[str, Any] = None
     ) -> Dict[str, Any]:
+        await self._sync()
         if projection is not None:
             return await self.db.find_one(query, projection=projection)
         return await self.db.find_one(query)
@@ -346,4 +984,7 @@ class Document:
         """
         if quarry is None:
             quarry = dict()
-        return await self.db.delete_many(quarry)
+        await self._sync()
+        result = await self.db.delete_many(quarry)
+        self._invalidate()
+        return result
@@ -0,0 +1,784 @@
+"""
+An in-memory stand-in for the Motor client, so Document runs without a MongoDB server.
+Pass `mongo=memory://` in the environment or build a MemoryClient yourself:
+
+    db = MemoryClient()["database"]
+    collection = Document(db, "collection")
+
+Supports the subset of the query/update language Document uses, which is
+enough for tests and benchmarks, not a full MongoDB implementation.
+Everything runs synchronously on the event loop, so results are deterministic.
+"""
+import re
+from copy import deepcopy
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+from pymongo import (
+    ReturnDocument, InsertOne, UpdateOne, UpdateMany,
+    ReplaceOne, DeleteOne, DeleteMany, IndexModel
+)
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    BulkWriteResult, DeleteResult, InsertManyResult,
+    InsertOneResult, UpdateResult
+)
+
+__all__ = ["MemoryClient", "MemoryDatabase", "MemoryCollection", "MemoryCursor"]
+
+_MISSING = object()
+SortSpec = Union[None, str, Dict[str, int], List[Tuple[str, int]]]
+
+
+# <-- Documents -->
+def _freeze(value: Any) -> Hashable:
+    """Hashable version of an `_id`"""
+    if isinstance(value, dict):
+        return tuple((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _get(doc: Any, path: str) -> Any:
+    """Value at a dotted `path`, `_MISSING` if any part of it doesn't exist"""
+    for part in path.split("."):
+        if isinstance(doc, dict):
+            doc = doc.get(part, _MISSING)
+        elif isinstance(doc, list) and part.isdigit() and int(part) < len(doc):
+            doc = doc[int(part)]
+        else:
+            return _MISSING
+        if doc is _MISSING:
+            return _MISSING
+    return doc
+
+
+def _set(doc: Dict[str, Any], path: str, value: Any) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        if isinstance(doc, list) and part.isdigit():
+            doc = doc[int(part)]
+            continue
+        child = doc.get(part)
+        if not isinstance(child, (dict, list)):
+            child = doc[part] = {}
+        doc = child
+    if isinstance(doc, list) and last.isdigit():
+        doc[int(last)] = value
+    else:
+        doc[last] = value
+
+
+def _unset(doc: Dict[str, Any], path: str) -> None:
+    *parents, last = path.split(".")
+    parent = _get(doc, ".".join(parents)) if parents else doc
+    if isinstance(parent, dict):
+        parent.pop(last, None)
+
+
+# Mongo's comparison order between BSON types
+def _rank(value: Any) -> int:
+    if value is _MISSING or value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    rank = _rank(value)
+    if rank == 1:
+        return rank, 0
+    if rank in (4, 5, 10):
+        return rank, repr(value)
+    return rank, value
+
+
+def _compare(value: Any, other: Any, operator: Callable[[Any, Any], bool]) -> bool:
+    """Range comparison, only true between values of the same type like mongo does"""
+    if isinstance(value, list):
+        return any(_compare(item, other, operator) for item in value)
+    if value is _MISSING or _rank(value) != _rank(other):
+        return False
+    return operator(_sort_key(value), _sort_key(other))
+
+
+def _equals(value: Any, other: Any) -> bool:
+    if value is _MISSING:
+        return other is None
+    if value == other:
+        return True
+    return isinstance(value, list) and not isinstance(other, list) and other in value
+
+
+# <-- Queries -->
+_COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+
+def _is_operator_dict(value: Any) -> bool:
+    return isinstance(value, dict) and bool(value) and all(key.startswith("$") for key in value)
+
+
+def _match_value(value: Any, condition: Any) -> bool:
+    if not _is_operator_dict(condition):
+        if isinstance(condition, re.Pattern):
+            return isinstance(value, str) and bool(condition.search(value))
+        return _equals(value, condition)
+    for operator, argument in condition.items():
+        if operator == "$eq":
+            matched = _equals(value, argument)
+        elif operator == "$ne":
+            matched = not _equals(value, argument)
+        elif operator in _COMPARISONS:
+            matched = _compare(value, argument, _COMPARISONS[operator])
+        elif operator == "$in":
+            matched = any(_equals(value, item) for item in argument)
+        elif operator == "$nin":
+            matched = not any(_equals(value, item) for item in argument)
+        elif operator == "$exists":
+            matched = (value is not _MISSING) == bool(argument)
+        elif operator == "$size":
+            matched = isinstance(value, list) and len(value) == argument
+        elif operator == "$not":
+            matched = not _match_value(value, argument)
+        elif operator == "$all":
+            matched = isinstance(value, list) and all(item in value for item in argument)
+        elif operator == "$elemMatch":
+            matched = isinstance(value, list) and any(
+                match(item, argument) if isinstance(item, dict) else _match_value(item, argument) for item in value)
+        elif operator == "$regex":
+            matched = isinstance(value, str) and bool(re.search(argument, value, _regex_flags(condition)))
+        elif operator == "$options":
+            continue
+        else:
+            raise OperationFailure(f"unknown operator: {operator}")
+        if not matched:
+            return False
+    return True
+
+
+def _regex_flags(condition: Dict[str, Any]) -> int:
+    flags = 0
+    for option in condition.get("$options", ""):
+        flags |= {"i": re.I, "m": re.M, "s": re.S, "x": re.X}.get(option, 0)
+    return flags
+
+
+def match(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Checks if `doc` matches the mongo `query`"""
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            matched = all(match(doc, sub_query) for sub_query in condition)
+        elif key == "$or":
+            matched = any(match(doc, sub_query) for sub_query in condition)
+        elif key == "$nor":
+            matched = not any(match(doc, sub_query) for sub_query in condition)
+        elif key == "$expr":
+            matched = _truthy(evaluate(condition, doc))
+        elif key.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {key}")
+        else:
+            matched = _match_value(_get(doc, key), condition)
+        if not matched:
+            return False
+    return True
+
+
+# <-- Aggregation expressions -->
+def _truthy(value: Any) -> bool:
+    return value not in (None, False, 0, _MISSING)
+
+
+def _number(values: Iterable[Any]) -> List[Union[int, float]]:
+    return [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+
+
+_EXPRESSIONS: Dict[str, Callable[..., Any]] = {
+    "$eq": lambda a, b: _sort_key(a) == _sort_key(b),
+    "$ne": lambda a, b: _sort_key(a) != _sort_key(b),
+    "$gt": lambda a, b: _sort_key(a) > _sort_key(b),
+    "$gte": lambda a, b: _sort_key(a) >= _sort_key(b),
+    "$lt": lambda a, b: _sort_key(a) < _sort_key(b),
+    "$lte": lambda a, b: _sort_key(a) <= _sort_key(b),
+    "$and": lambda *args: all(_truthy(arg) for arg in args),
+    "$or": lambda *args: any(_truthy(arg) for arg in args),
+    "$not": lambda arg: not _truthy(arg),
+    "$size": lambda arg: len(arg),
+    "$objectToArray": lambda arg: [{"k": key, "v": value} for key, value in arg.items()],
+    "$add": lambda *args: sum(_number(args)),
+    "$subtract": lambda a, b: a - b,
+    "$multiply": lambda *args: _product(_number(args)),
+    "$divide": lambda a, b: a / b,
+    "$ifNull": lambda *args: next((arg for arg in args if arg is not None), None),
+    "$in": lambda a, b: a in b,
+    "$cond": lambda condition, then, otherwise: then if _truthy(condition) else otherwise,
+}
+
+
+def _product(values: List[Union[int, float]]) -> Union[int, float]:
+    result = 1
+    for value in values:
+        result *= value
+    return result
+
+
+def evaluate(expression: Any, doc: Dict[str, Any]) -> Any:
+    """Evaluates an aggregation `expression` against `doc`"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        if expression in ("$$ROOT", "$$CURRENT"):
+            return doc
+        value = _get(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, list):
+        return [evaluate(item, doc) for item in expression]
+    if isinstance(expression, dict):
+        if len(expression) == 1:
+            operator, arguments = next(iter(expression.items()))
+            if operator == "$literal":
+                return arguments
+            if operator in _EXPRESSIONS:
+                if isinstance(arguments, dict) and operator == "$cond":
+                    arguments = [arguments["if"], arguments["then"], arguments["else"]]
+                if not isinstance(arguments, list) or operator in ("$size", "$objectToArray", "$not"):
+                    arguments = [arguments]
+                return _EXPRESSIONS[operator](*(evaluate(argument, doc) for argument in arguments))
+            if operator.startswith("$"):
+                raise OperationFailure(f"unsupported expression: {operator}")
+        return {key: evaluate(value, doc) for key, value in expression.items()}
+    return expression
+
+
+# <-- Updates -->
+def _each(value: Any) -> List[Any]:
+    if isinstance(value, dict) and "$each" in value:
+        return list(value["$each"])
+    return [value]
+
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> None:
+    """Applies a mongo `update` to `doc` in place"""
+    if not _is_operator_dict(update):
+        _id = doc.get("_id", _MISSING)
+        doc.clear()
+        doc.update(deepcopy(update))
+        if _id is not _MISSING:
+            doc["_id"] = _id
+        return
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            current = _get(doc, path)
+            if operator == "$set":
+                _set(doc, path, deepcopy(value))
+            elif operator == "$setOnInsert":
+                if inserting:
+                    _set(doc, path, deepcopy(value))
+            elif operator == "$unset":
+                _unset(doc, path)
+            elif operator == "$inc":
+                _set(doc, path, value if current is _MISSING else current + value)
+            elif operator == "$mul":
+                _set(doc, path, 0 if current is _MISSING else current * value)
+            elif operator == "$min":
+                if current is _MISSING or _sort_key(value) < _sort_key(current):
+                    _set(doc, path, deepcopy(value))
+            elif operator == "$max":
+                if current is _MISSING or _sort_key(value) > _sort_key(current):
+                    _set(doc, path, deepcopy(value))
+            elif operator == "$push":
+                if current is _MISSING:
+                    current = []
+                    _set(doc, path, current)
+                current.extend(deepcopy(_each(value)))
+            elif operator == "$addToSet":
+                if current is _MISSING:
+                    current = []
+                    _set(doc, path, current)
+                for item in _each(value):
+                    if item not in current:
+                        current.append(deepcopy(item))
+            elif operator == "$pull":
+                if isinstance(current, list):
+                    current[:] = [
+                        item for item in current if not (
+                            match(item, value) if isinstance(item, dict) and isinstance(value, dict)
+                            else _match_value(item, value)
+                        )
+                    ]
+            elif operator == "$rename":
+                if current is not _MISSING:
+                    _unset(doc, path)
+                    _set(doc, value, current)
+            else:
+                raise OperationFailure(f"unknown update operator: {operator}")
+
+
+def _upsert_base(query: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The document an upsert starts from, built from the equality parts of `query`"""
+    doc: Dict[str, Any] = {}
+    for key, value in (query or {}).items():
+        if key == "$and":
+            for sub_query in value:
+                doc.update(_upsert_base(sub_query))
+        elif not key.startswith("$"):
+            if _is_operator_dict(value):
+                if "$eq" in value:
+                    _set(doc, key, deepcopy(value["$eq"]))
+            else:
+                _set(doc, key, deepcopy(value))
+    return doc
+
+
+# <-- Projection, sort and pipelines -->
+def project(doc: Dict[str, Any], projection: Optional[Union[Dict[str, Any], List[str]]]) -> Dict[str, Any]:
+    if not projection:
+        return doc
+    if isinstance(projection, list):
+        projection = {field: 1 for field in projection}
+    include_id = projection.get("_id", 1)
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and all(value in (0, False) for value in fields.values()):
+        result = deepcopy(doc)
+        for path in fields:
+            _unset(result, path)
+        if not include_id:
+            result.pop("_id", None)
+        return result
+    result: Dict[str, Any] = {}
+    if include_id not in (0, False) and "_id" in doc:
+        result["_id"] = doc["_id"] if include_id in (1, True) else evaluate(include_id, doc)
+    for path, value in fields.items():
+        if value in (1, True):
+            current = _get(doc, path)
+            if current is not _MISSING:
+                _set(result, path, current)
+        else:
+            _set(result, path, evaluate(value, doc))
+    return result
+
+
+def _sort_spec(sort: SortSpec, direction: int = 1) -> List[Tuple[str, int]]:
+    if sort is None:
+        return []
+    if isinstance(sort, str):
+        return [(sort, direction)]
+    if isinstance(sort, dict):
+        return list(sort.items())
+    return [(key, value) for key, value in sort]
+
+
+def sort_documents(docs: List[Dict[str, Any]], spec: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    for field, direction in reversed(spec):
+        docs.sort(key=lambda doc: _sort_key(_get(doc, field)), reverse=direction < 0)
+    return docs
+
+
+def _group(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Hashable, Dict[str, Any]] = {}
+    values: Dict[Hashable, Dict[str, List[Any]]] = {}
+    for doc in docs:
+        _id = evaluate(spec["_id"], doc)
+        key = _freeze(_id)
+        if key not in groups:
+            groups[key] = {"_id": _id}
+            values[key] = {field: [] for field in spec if field != "_id"}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            operator, argument = next(iter(accumulator.items()))
+            values[key][field].append(1 if operator == "$count" else evaluate(argument, doc))
+    for key, group in groups.items():
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            operator = next(iter(accumulator))
+            collected = values[key][field]
+            if operator in ("$sum", "$count"):
+                group[field] = sum(_number(collected))
+            elif operator == "$avg":
+                numbers = _number(collected)
+                group[field] = sum(numbers) / len(numbers) if numbers else None
+            elif operator == "$min":
+                group[field] = min((value for value in collected if value is not None), key=_sort_key, default=None)
+            elif operator == "$max":
+                group[field] = max((value for value in collected if value is not None), key=_sort_key, default=None)
+            elif operator == "$first":
+                group[field] = collected[0] if collected else None
+            elif operator == "$last":
+                group[field] = collected[-1] if collected else None
+            elif operator == "$push":
+                group[field] = collected
+            elif operator == "$addToSet":
+                group[field] = [value for index, value in enumerate(collected) if value not in collected[:index]]
+            else:
+                raise OperationFailure(f"unknown group operator: {operator}")
+    return list(groups.values())
+
+
+def run_pipeline(docs: List[Dict[str, Any]], pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for stage in pipeline:
+        operator, argument = next(iter(stage.items()))
+        if operator == "$match":
+            docs = [doc for doc in docs if match(doc, argument)]
+        elif operator == "$sort":
+            docs = sort_documents(docs, _sort_spec(argument))
+        elif operator == "$skip":
+            docs = docs[argument:]
+        elif operator == "$limit":
+            docs = docs[:argument]
+        elif operator == "$project":
+            docs = [project(doc, argument) for doc in docs]
+        elif operator == "$group":
+            docs = _group(docs, argument)
+        elif operator in ("$addFields", "$set"):
+            for doc in docs:
+                for path, expression in argument.items():
+                    _set(doc, path, evaluate(expression, doc))
+        elif operator == "$unset":
+            for doc in docs:
+                for path in ([argument] if isinstance(argument, str) else argument):
+                    _unset(doc, path)
+        elif operator == "$unwind":
+            path = (argument if isinstance(argument, str) else argument["path"])[1:]
+            unwound = []
+            for doc in docs:
+                for item in _get(doc, path) if isinstance(_get(doc, path), list) else []:
+                    copy = deepcopy(doc)
+                    _set(copy, path, item)
+                    unwound.append(copy)
+            docs = unwound
+        elif operator == "$count":
+            docs = [{argument: len(docs)}] if docs else []
+        else:
+            raise OperationFailure(f"unsupported pipeline stage: {operator}")
+    return docs
+
+
+# <-- Motor like API -->
+class MemoryCursor:
+    """Cursor returned by find and aggregate, documents are produced on first iteration"""
+
+    def __init__(
+            self, produce: Callable[[], List[Dict[str, Any]]],
+            projection: Optional[Dict[str, Any]] = None, plan: str = "COLLSCAN"):
+        self._produce = produce
+        self._projection = projection
+        self._plan = plan
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list: SortSpec, direction: int = 1) -> "MemoryCursor":
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, _batch_size: int) -> "MemoryCursor":
+        return self
+
+    def _documents(self) -> List[Dict[str, Any]]:
+        docs = sort_documents(self._produce(), self._sort)
+        docs = docs[self._skip:]
+        if self._limit > 0:
+            docs = docs[:self._limit]
+        return [deepcopy(project(doc, self._projection)) for doc in docs]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._documents():
+            yield doc
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        docs = self._documents()
+        return docs if length is None else docs[:length]
+
+    async def explain(self) -> Dict[str, Any]:
+        return {"queryPlanner": {"winningPlan": {"stage": self._plan}}}
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._docs: Dict[Hashable, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[str, Any]] = {"_id_": {"v": 2, "key": [("_id", 1)]}}
+
+    # <-- Internals -->
+    def _ids(self, query: Optional[Dict[str, Any]]) -> Optional[List[Hashable]]:
+        """Keys an `_id` lookup can be answered with directly, None when the whole collection must be scanned"""
+        if not query or "_id" not in query:
+            return None
+        condition = query["_id"]
+        if not _is_operator_dict(condition):
+            return [_freeze(condition)]
+        if list(condition) == ["$in"]:
+            return [_freeze(_id) for _id in condition["$in"]]
+        return None
+
+    def _matching(self, query: Optional[Dict[str, Any]], limit: int = 0) -> List[Dict[str, Any]]:
+        """The stored (not copied) documents matching `query`"""
+        keys = self._ids(query)
+        candidates = self._docs.values() if keys is None else (
+            self._docs[key] for key in keys if key in self._docs)
+        found = []
+        for doc in candidates:
+            if match(doc, query):
+                found.append(doc)
+                if len(found) == limit:
+                    break
+        return found
+
+    def _insert(self, doc: Dict[str, Any]) -> Any:
+        if "_id" not in doc:
+            from bson import ObjectId
+            doc["_id"] = ObjectId()
+        key = _freeze(doc["_id"])
+        if key in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} _id: {doc['_id']!r}")
+        self._docs[key] = doc
+        return doc["_id"]
+
+    def _update(
+            self, query: Dict[str, Any], update: Union[Dict[str, Any], List[Dict[str, Any]]],
+            upsert: bool, many: bool
+    ) -> Tuple[int, int, Any, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Returns matched, modified, upserted _id and the last document before and after the update"""
+        if isinstance(update, list):
+            raise OperationFailure("update pipelines are not supported by the memory backend")
+        docs = self._matching(query, 0 if many else 1)
+        if not docs:
+            if not upsert:
+                return 0, 0, None, None, None
+            doc = _upsert_base(query)
+            apply_update(doc, update, inserting=True)
+            if "_id" not in doc and "_id" in query and not _is_operator_dict(query["_id"]):
+                doc["_id"] = deepcopy(query["_id"])
+            return 0, 0, self._insert(doc), None, doc
+        modified = 0
+        before = None
+        for doc in docs:
+            before = deepcopy(doc)
+            apply_update(doc, update)
+            if doc.get("_id") != before.get("_id"):
+                doc["_id"] = before["_id"]
+                raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'")
+            modified += doc != before
+        return len(docs), modified, None, before, docs[-1]
+
+    # <-- Reads -->
+    def find(
+            self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, *,
+            sort: SortSpec = None, skip: int = 0, limit: int = 0, batch_size: int = 0, **_kwargs
+    ) -> MemoryCursor:
+        cursor = MemoryCursor(
+            lambda: self._matching(filter), projection,
+            "COLLSCAN" if self._ids(filter) is None else "IDHACK"
+        )
+        return cursor.sort(sort).skip(skip).limit(limit).batch_size(batch_size)
+
+    async def find_one(
+            self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+            **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        if kwargs.get("sort") or kwargs.get("skip"):
+            docs = await self.find(filter, projection, **kwargs).limit(1).to_list()
+            return docs[0] if docs else None
+        docs = self._matching(filter, 1)
+        return deepcopy(project(docs[0], projection)) if docs else None
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **_kwargs) -> MemoryCursor:
+        return MemoryCursor(lambda: run_pipeline([deepcopy(doc) for doc in self._docs.values()], pipeline))
+
+    async def count_documents(self, filter: Dict[str, Any], **_kwargs) -> int:
+        return len(self._matching(filter))
+
+    async def estimated_document_count(self, **_kwargs) -> int:
+        return len(self._docs)
+
+    # <-- Writes -->
+    async def insert_one(self, document: Dict[str, Any], **_kwargs) -> InsertOneResult:
+        doc = deepcopy(document)
+        inserted_id = self._insert(doc)
+        document.setdefault("_id", inserted_id)
+        return InsertOneResult(inserted_id, True)
+
+    async def insert_many(self, documents: Iterable[Dict[str, Any]], **_kwargs) -> InsertManyResult:
+        return InsertManyResult([(await self.insert_one(document)).inserted_id for document in documents], True)
+
+    async def update_one(
+            self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **_kwargs) -> UpdateResult:
+        matched, modified, upserted_id, _, _ = self._update(filter, update, upsert, many=False)
+        return UpdateResult(self._raw_update(matched, modified, upserted_id), True)
+
+    async def update_many(
+            self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **_kwargs) -> UpdateResult:
+        matched, modified, upserted_id, _, _ = self._update(filter, update, upsert, many=True)
+        return UpdateResult(self._raw_update(matched, modified, upserted_id), True)
+
+    async def replace_one(
+            self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **_kwargs
+    ) -> UpdateResult:
+        if _is_operator_dict(replacement):
+            raise ValueError("replacement can not include $ operators")
+        matched, modified, upserted_id, _, _ = self._update(filter, replacement, upsert, many=False)
+        return UpdateResult(self._raw_update(matched, modified, upserted_id), True)
+
+    @staticmethod
+    def _raw_update(matched: int, modified: int, upserted_id: Any) -> Dict[str, Any]:
+        if upserted_id is not None:
+            return {"n": 1, "nModified": 0, "upserted": upserted_id}
+        return {"n": matched, "nModified": modified}
+
+    async def find_one_and_update(
+            self, filter: Dict[str, Any], update: Dict[str, Any], projection: Optional[Dict[str, Any]] = None,
+            sort: SortSpec = None, upsert: bool = False,
+            return_document: bool = ReturnDocument.BEFORE, **_kwargs
+    ) -> Optional[Dict[str, Any]]:
+        if sort:
+            first = await self.find_one(filter, {"_id": 1}, sort=sort)
+            if first is not None:
+                filter = {"_id": first["_id"]}
+        _, _, upserted_id, before, after = self._update(filter, update, upsert, many=False)
+        doc = after if return_document else (None if upserted_id is not None else before)
+        return None if doc is None else deepcopy(project(doc, projection))
+
+    async def find_one_and_delete(self, filter: Dict[str, Any], **_kwargs) -> Optional[Dict[str, Any]]:
+        docs = self._matching(filter, 1)
+        if not docs:
+            return None
+        return self._docs.pop(_freeze(docs[0]["_id"]))
+
+    async def delete_one(self, filter: Dict[str, Any], **_kwargs) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, 1)}, True)
+
+    async def delete_many(self, filter: Dict[str, Any], **_kwargs) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, 0)}, True)
+
+    def _delete(self, query: Dict[str, Any], limit: int) -> int:
+        docs = self._matching(query, limit)
+        for doc in docs:
+            del self._docs[_freeze(doc["_id"])]
+        return len(docs)
+
+    # noinspection PyProtectedMember
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **_kwargs) -> BulkWriteResult:
+        result = {
+            "writeErrors": [], "writeConcernErrors": [], "upserted": [],
+            "nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0
+        }
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(deepcopy(request._doc))
+                    result["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    matched, modified, upserted_id, _, _ = self._update(
+                        request._filter, request._doc, bool(request._upsert), many=isinstance(request, UpdateMany))
+                    result["nMatched"] += matched
+                    result["nModified"] += modified
+                    if upserted_id is not None:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": index, "_id": upserted_id})
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    result["nRemoved"] += self._delete(request._filter, 1 if isinstance(request, DeleteOne) else 0)
+                else:
+                    raise TypeError(f"{request!r} is not a valid request")
+            except (DuplicateKeyError, OperationFailure) as error:
+                result["writeErrors"].append({
+                    "index": index, "code": getattr(error, "code", None) or 2, "errmsg": str(error), "op": request})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    async def drop(self) -> None:
+        self._docs.clear()
+        self._indexes = {"_id_": {"v": 2, "key": [("_id", 1)]}}
+
+    # <-- Indexes (only bookkeeping, lookups by _id are the only fast path) -->
+    async def index_information(self) -> Dict[str, Dict[str, Any]]:
+        return deepcopy(self._indexes)
+
+    async def create_indexes(self, indexes: List[IndexModel], **_kwargs) -> List[str]:
+        names = []
+        for index in indexes:
+            document = dict(index.document)
+            name = document.pop("name")
+            document["key"] = list(document["key"].items())
+            self._indexes[name] = {"v": 2, **document}
+            names.append(name)
+        return names
+
+    async def create_index(self, keys: Union[str, List[Tuple[str, int]]], **kwargs) -> str:
+        return (await self.create_indexes([IndexModel(keys, **kwargs)]))[0]
+
+    async def drop_index(self, name: str, **_kwargs) -> None:
+        if name == "_id_" or name not in self._indexes:
+            raise OperationFailure(f"index not found with name [{name}]")
+        del self._indexes[name]
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(self, name)
+        return collection
+
+    async def list_collection_names(self, **_kwargs) -> List[str]:
+        return list(self._collections)
+
+    async def command(self, command: str, value: Any = None, **kwargs) -> Dict[str, Any]:
+        if command == "ping":
+            return {"ok": 1.0}
+        if command == "aggregate" and kwargs.get("explain"):
+            return {"stages": [{"$cursor": {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}}], "ok": 1.0}
+        raise OperationFailure(f"command {command} is not supported by the memory backend")
+
+
+class MemoryClient:
+    """Drop-in for AsyncIOMotorClient, accepts and ignores the usual client options"""
+
+    def __init__(self, *_args, **_kwargs):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = MemoryDatabase(self, name)
+        return database
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,191 @@
+import asyncio
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from nextcord import Message, ui
+
+from utils import logging
+
+__all__ = ["Timer", "TimerWheel", "MessageWaiters", "WheelView", "timer_wheel"]
+
+logger = logging.get_logger(__name__)
+
+
+class Timer:
+    """A callback scheduled on a TimerWheel, `cancel` takes it off the wheel"""
+    __slots__ = ("_wheel", "callback", "args", "slot", "rounds")
+
+    def __init__(
+            self, wheel: "TimerWheel", callback: Callable[..., Any], args: Tuple[Any, ...], slot: int, rounds: int):
+        self._wheel = wheel
+        self.callback = callback
+        self.args = args
+        self.slot = slot
+        self.rounds = rounds
+
+    def cancel(self):
+        self._wheel._slots[self.slot].discard(self)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel, many timeouts for one background task.
+    Scheduling and cancelling are O(1), each tick only looks at the timers of one slot.
+    Timers never fire early and up to `tick` seconds late, which is plenty for view and prompt timeouts
+    Params:
+     - tick (float) : Seconds per slot, the timer resolution
+     - slots (int) : Slots of the wheel, delays over tick * slots go around more than once
+    """
+    __slots__ = ("tick", "_slots", "_cursor", "_tick_at", "_task")
+
+    def __init__(self, tick: float = 1.0, slots: int = 512):
+        self.tick = tick
+        self._slots: List[Set[Timer]] = [set() for _ in range(slots)]
+        self._cursor = 0
+        self._tick_at = 0.0  # When the wheel reached the current slot
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self, delay: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        """
+        Calls `callback(*args)` after `delay` seconds, coroutine functions are run as a task
+        """
+        if self._task is None or self._task.done():
+            self._tick_at = time.monotonic()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        # Counted from when the current slot was reached, the part of the tick already gone is not waited for
+        ticks = max(1, math.ceil((delay + time.monotonic() - self._tick_at) / self.tick))
+        slots = len(self._slots)
+        timer = Timer(self, callback, args, (self._cursor + ticks) % slots, (ticks - 1) // slots)
+        self._slots[timer.slot].add(timer)
+        return timer
+
+    async def _run(self):
+        while True:
+            next_tick = self._tick_at + self.tick
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+            self._tick_at = next_tick
+            self._advance()
+
+    def _advance(self):
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        bucket = self._slots[self._cursor]
+        for timer in list(bucket):
+            if timer.rounds:
+                timer.rounds -= 1
+                continue
+            bucket.discard(timer)
+            # One failing callback must not stop the task every other timer depends on
+            try:
+                result = timer.callback(*timer.args)
+                if asyncio.iscoroutine(result):
+                    asyncio.create_task(result)
+            except Exception as error:
+                logger.error("Timer callback %r failed: %r", timer.callback, error, exc_info=error)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._slots)
+
+
+# Shared by the views and prompts, one task for every timeout of the bot
+timer_wheel = TimerWheel()
+
+
+class MessageWaiters:
+    """
+    Futures waiting for the next message of an author in a channel, keyed by (channel id, author id).
+    Unlike bot.wait_for, where every incoming message runs the check of every waiter,
+    a message only looks up its own key. Feed it every message with `dispatch`, which is
+    synchronous, so it can be called straight from the bot's dispatch
+    Params:
+     - wheel (TimerWheel) : Where the timeouts are scheduled
+    """
+    __slots__ = ("_wheel", "_waiters")
+
+    def __init__(self, wheel: TimerWheel = timer_wheel):
+        self._wheel = wheel
+        self._waiters: Dict[Tuple[int, int], List[asyncio.Future]] = {}
+
+    async def wait(self, channel_id: int, author_id: int, timeout: float) -> Message:
+        """
+        The next message of `author_id` in `channel_id`
+        Raises asyncio.TimeoutError after `timeout` seconds, like bot.wait_for
+        """
+        key = (channel_id, author_id)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append(future)
+        timer = self._wheel.schedule(timeout, self._expire, future)
+        try:
+            return await future
+        finally:
+            timer.cancel()
+            futures = self._waiters.get(key)
+            if futures is not None:
+                if future in futures:
+                    futures.remove(future)
+                if not futures:
+                    del self._waiters[key]
+
+    @staticmethod
+    def _expire(future: asyncio.Future):
+        if not future.done():
+            future.set_exception(asyncio.TimeoutError())
+
+    def dispatch(self, message: Message):
+        futures = self._waiters.pop((message.channel.id, message.author.id), None)
+        if not futures:
+            return
+        for future in futures:
+            if not future.done():
+                future.set_result(message)
+
+    def __len__(self) -> int:
+        return sum(len(futures) for futures in self._waiters.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._waiters)
+
+
+class WheelView(ui.View):
+    """
+    ui.View timing out on the timer wheel instead of a sleeping task per view.
+    Like nextcord's timeout, every interaction pushes the expiry back
+    Params:
+     - timeout (float) : Seconds without interaction before `on_timeout`
+    """
+
+    def __init__(self, timeout: float = 180.0, wheel: TimerWheel = timer_wheel):
+        super().__init__(timeout=None)
+        self.lifetime = timeout
+        self._wheel = wheel
+        self._timer: Optional[Timer] = None
+
+    def _start_listening_from_store(self, store):
+        # Only counts from when the view is sent, one that never was never times out
+        super()._start_listening_from_store(store)
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._wheel.schedule(self.lifetime, self._expire)
+
+    def _expire(self):
+        self._timer = None
+        # Same path as nextcord's own timeout, on_timeout runs and wait() returns True
+        self._dispatch_timeout()
+
+    def _dispatch_item(self, item, interaction):
+        if not self.is_finished():
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = self._wheel.schedule(self.lifetime, self._expire)
+        super()._dispatch_item(item, interaction)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        super().stop()
@@ -1,3 +1,4 @@
+import os
 from typing import TYPE_CHECKING
 from json import JSONDecodeError
 from typing import Union, Optional
@@ -45,7 +46,7 @@ async def get_message(
      - Optional Params:
         - title (string) : Embed title
         - description (string) : Embed description
-        - timeout (int) : Timeout for wait_for
+        - timeout (int) : Seconds to wait for the message
     Returns:
      - msg.content (string) : If a message is detected, the content will be returned
      or
@@ -54,10 +55,7 @@ async def get_message(
     embed = Embed(title=title, description=description, color=Color.dark_theme())
     origin = await ctx.send(embed=embed)
     try:
-        msg = await ctx.bot.wait_for(
-            "message", timeout=timeout,
-            check=lambda message: message.author == ctx.author and message.channel == ctx.channel,
-        )
+        msg = await ctx.bot.message_waiters.wait(ctx.channel.id, ctx.author.id, timeout)
         if delete_origin:
             await origin.delete()
         if msg:
@@ -85,7 +83,7 @@ class Raise:
     async def __response(self, message: str, emoji_dict, delete_after, edit) -> Optional[Message]:
         if isinstance(self.ctx, Interaction):
             if edit:
-                await self.ctx.response.edit_message(
+                return await self.ctx.response.edit_message(
                     embed=Embed(color=emoji_dict.color, description=f"{emoji_dict.emoji} **{message}**"), view=None)
             await self.ctx.response.send_message(
                 embed=Embed(color=emoji_dict.color, description=f"{emoji_dict.emoji} **{message}**"), ephemeral=True)
@@ -136,6 +134,18 @@ def human_readable_time(dt, short: bool = False):
             return f"`{s}` seconds"
 
 
+def rss_mb() -> Optional[float]:
+    """
+    Resident memory of the process in MiB, None where /proc isn't available
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
 def clean_code(content):
     if content.startswith("```") and content.endswith("```"):
         return "\n".join(content.split("\n")[1:])[:-3]